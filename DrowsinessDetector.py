@@ -1,19 +1,40 @@
 import traceback
-import queue
 import threading
 import time
 import winsound
 import cv2
-import numpy as np
-from ultralytics import YOLO
-import mediapipe as mp
 import sys
-import requests
 import json
 from PySide2.QtWidgets import QApplication, QLabel, QMainWindow, QHBoxLayout, QWidget, QMessageBox
 from PySide2.QtGui import QImage, QPixmap
-from PySide2.QtCore import Qt, QTimer
-from config import DEEPSEEK_API_CONFIG, DROWSINESS_THRESHOLDS, UI_CONFIG, ALERT_CONFIG
+from PySide2.QtCore import Qt, QTimer, QObject, Signal
+from config import UI_CONFIG, ALERT_CONFIG, SESSION_LOG_CONFIG
+from detection_pipeline import DetectionPipeline, open_camera
+from frame_capture import LatestFrameSlot
+from alert_service import AlertService, AlertPrefetcher, MessageCache, status_signature
+from session_log import SessionRecorder
+
+ALERT_FALLBACK = "请注意行车安全，如感觉疲劳请及时休息。"
+
+class AlertBridge(QObject):
+    """把警告服务后台线程返回的文本转交给界面主线程"""
+    message_ready = Signal(str)
+
+class FrameBridge(QObject):
+    """
+    把检测线程发布的结果转交给界面主线程：只保留最新一帧（LatestFrameSlot），
+    缓冲由空变满时才发出不带数据的信号，界面跟不上时旧帧被覆盖，排队的信号最多一个
+    """
+    frame_ready = Signal()
+
+    def __init__(self):
+        super().__init__()
+        self.slot = LatestFrameSlot()
+
+    def publish(self, frame, result):
+        """检测引擎的订阅回调（检测线程）"""
+        if not self.slot.put((frame, result)):
+            self.frame_ready.emit()
 
 class DrowsinessDetector(QMainWindow):
     def __init__(self):
@@ -22,27 +43,27 @@ class DrowsinessDetector(QMainWindow):
         print("Qt window initialized")
 
         print("[DEBUG] Setting initial variables...")
-        self.yawn_state = ''
-        self.left_eye_state =''
-        self.right_eye_state= ''
         self.alert_text = ''
         self.vehicle_speed = 100  # 模拟车速，实际应从车辆系统获取
-        self.last_alert_time = 0
-        self.alert_cooldown = DROWSINESS_THRESHOLDS['alert_cooldown']
-
-        self.blinks = 0
-        self.microsleeps = 0
-        self.yawns = 0
-        self.yawn_duration = 0 
-
-        self.left_eye_still_closed = False  
-        self.right_eye_still_closed = False 
-        self.yawn_in_progress = False  
-        
-        print("[DEBUG] Initializing MediaPipe...")
-        self.face_mesh = mp.solutions.face_mesh.FaceMesh(min_detection_confidence=0.5, min_tracking_confidence=0.5)
-        self.points_ids = [187, 411, 152, 68, 174, 399, 298]
-        print("[DEBUG] MediaPipe initialized")
+        self.is_drowsy = False
+
+        # 检测引擎：FaceMesh 定位眼睛/嘴部后对 ROI 推理
+        # 闭眼/哈欠时长为当前这一次的连续时长，睁眼或哈欠结束即清零
+        self.pipeline = DetectionPipeline(mode="roi", decay=False)
+        self.stats = self.pipeline.stats
+        self.frame_bridge = FrameBridge()
+        self.frame_bridge.frame_ready.connect(self.on_frame_processed)
+
+        # DeepSeek 警告在后台请求（按驾驶状态缓存），结果经信号回到主线程
+        self.alert_service = AlertService(cache=MessageCache.from_config())
+        self.alert_bridge = AlertBridge()
+        self.alert_bridge.message_ready.connect(self.on_alert_message)
+        self.alert_dialog = None
+        # 疲劳指标接近阈值时提前生成警告文本（读取流水线每帧的规则判定）
+        self.alert_prefetcher = AlertPrefetcher(
+            self.alert_service, "drowsy", self.build_prefetch_prompt, max_tokens=100, timeout=5,
+            rules=self.pipeline.rules
+        )
 
         print("[DEBUG] Setting up UI...")
         self.setWindowTitle(UI_CONFIG['window_title'])
@@ -66,40 +87,27 @@ class DrowsinessDetector(QMainWindow):
         self.update_info()
         print("[DEBUG] UI setup completed")
         
-        print("[DEBUG] Loading YOLO models...")
-        print("[DEBUG] Loading yawn detection model...")
-        self.detectyawn = YOLO("runs/detectyawn/train/weights/best.pt")
-        print("[DEBUG] Yawn model loaded successfully")
-        
-        print("[DEBUG] Loading eye detection model...")
-        self.detecteye = YOLO("runs/detecteye/train/weights/best.pt")
-        print("[DEBUG] Eye model loaded successfully")
+        print("[DEBUG] Loading YOLO models and MediaPipe...")
+        self.pipeline.load_models()
+        print("[DEBUG] Models loaded successfully")
         
         print("[DEBUG] Initializing camera...")
         # Try different camera indices if 0 doesn't work
-        for i in range(3):
-            print(f"[DEBUG] Trying camera index {i}...")
-            self.cap = cv2.VideoCapture(i)
-            if self.cap.isOpened():
-                print(f"Using camera index {i}")
-                break
-            print(f"[DEBUG] Camera index {i} failed")
-        else:
+        self.cap = open_camera(range(3))
+        if self.cap is None:
             print("Error: Could not open any camera")
             sys.exit(1)
         time.sleep(1.000)
         print("[DEBUG] Camera initialized successfully")
 
-        print("[DEBUG] Setting up threads...")
-        self.frame_queue = queue.Queue(maxsize=2)
-        self.stop_event = threading.Event()
-
-        self.capture_thread = threading.Thread(target=self.capture_frames)
-        self.process_thread = threading.Thread(target=self.process_frames)
-
-        self.capture_thread.start()
-        self.process_thread.start()
-        print("[DEBUG] Threads started")
+        print("[DEBUG] Starting detection pipeline...")
+        self.pipeline.subscribe(self.frame_bridge.publish)
+        # 状态变化和警告写入会话日志，供事后审计
+        self.session_recorder = SessionRecorder.open("drowsy") if SESSION_LOG_CONFIG['enabled'] else None
+        if self.session_recorder is not None:
+            self.pipeline.subscribe(self.session_recorder.on_result)
+        self.pipeline.start(self.cap)
+        print("[DEBUG] Pipeline started")
         
         # 添加提示框计时器
         self.alert_timer = QTimer()
@@ -112,23 +120,21 @@ class DrowsinessDetector(QMainWindow):
         self.alert_box_cooldown = ALERT_CONFIG['box_cooldown']
         print("[DEBUG] DrowsinessDetector initialization completed")
 
-    def generate_status_report(self):
+    def generate_status_report(self, microsleeps=None, yawns=None, drowsy=None):
+        microsleeps = self.stats.microsleeps if microsleeps is None else microsleeps
+        yawns = self.stats.yawns if yawns is None else yawns
+        drowsy = self.is_drowsy if drowsy is None else drowsy
         status = {
             "vehicle_speed": f"{self.vehicle_speed} km/h",
-            "drowsiness_detected": "是" if self.microsleeps > 3 else "否",
-            "drowsiness_details": f"闭眼累计{round(self.microsleeps,2)}秒" if self.microsleeps > 0 else "正常",
+            "drowsiness_detected": "是" if drowsy else "否",
+            "drowsiness_details": f"闭眼累计{round(microsleeps,2)}秒" if microsleeps > 0 else "正常",
             "distraction_detected": "否",  # 可以根据实际检测扩展
-            "yawning_status": f"已打哈欠{self.yawns}次" if self.yawns > 0 else "正常"
+            "yawning_status": f"已打哈欠{yawns}次" if yawns > 0 else "正常"
         }
         return status
 
-    def get_deepseek_alert(self, status):
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {DEEPSEEK_API_CONFIG['api_key']}"
-        }
-        
-        prompt = f"""
+    def build_alert_prompt(self, status):
+        return f"""
         驾驶员状态汇报：
         - 车辆速度: {status['vehicle_speed']}（高速公路）
         - 疲劳检测: {status['drowsiness_detected']}（{status['drowsiness_details']}）
@@ -136,50 +142,37 @@ class DrowsinessDetector(QMainWindow):
         - 打哈欠状态: {status['yawning_status']}
         请以简洁礼貌的语气向驾驶员发出安全提醒。
         """
-        
-        try:
-            response = requests.post(
-                DEEPSEEK_API_CONFIG['api_endpoint'],
-                headers=headers,
-                json={
-                    "model": "deepseek-chat",
-                    "messages": [
-                        {"role": "user", "content": prompt}
-                    ],
-                    "temperature": 0.7,
-                    "max_tokens": 100
-                },
-                timeout=5  # 设置超时时间
-            )
-            
-            if response.status_code == 200:
-                try:
-                    return response.json()["choices"][0]["message"]["content"]
-                except (KeyError, IndexError):
-                    print("API响应格式错误")
-                    return "请注意行车安全，建议及时休息。"
-            else:
-                print(f"API请求失败: {response.status_code}")
-                return "请注意行车安全，如感觉疲劳请及时休息。"
-        except Exception as e:
-            print(f"DeepSeek API调用错误: {e}")
-            return "请注意行车安全，如感觉疲劳请及时休息。"
-
-    def update_info(self):
-        current_time = time.time()
-        status = self.generate_status_report()
-        
-        # 检查是否需要发出警告
-        alert_needed = (
-            round(self.yawn_duration, 2) > DROWSINESS_THRESHOLDS['yawn_duration_threshold'] or 
-            round(self.microsleeps, 2) > DROWSINESS_THRESHOLDS['microsleep_threshold'] or
-            self.yawns > DROWSINESS_THRESHOLDS['yawn_count_threshold']
+
+    def build_prefetch_prompt(self, microsleeps, yawns, yawn_duration):
+        # 预取的是“刚好越过阈值”时的提醒
+        return self.build_alert_prompt(self.generate_status_report(microsleeps, yawns, drowsy=True))
+
+    def request_alert(self, status):
+        """提交警告请求，立即返回缓存的提醒或本地提示；重复触发合并为一次请求"""
+        signature = status_signature(self.vehicle_speed, self.stats.microsleeps,
+                                     self.stats.yawns, self.stats.yawn_duration)
+        return self.alert_service.submit(
+            "drowsy", self.build_alert_prompt(status), ALERT_FALLBACK,
+            self.deliver_alert, max_tokens=100, timeout=5, signature=signature
         )
+
+    def deliver_alert(self, message):
+        """警告服务回调（后台线程）"""
+        self.alert_bridge.message_ready.emit(message)
+
+    def on_alert_message(self, message):
+        """远程警告文本就绪（主线程）：替换兜底提示"""
+        self.alert_text = message
+        if self.alert_dialog is not None and self.alert_dialog.isVisible():
+            self.alert_dialog.setText(message)
+
+    def update_info(self, result=None):
+        status = self.generate_status_report()
+        alert_needed = self.is_drowsy
         
-        # 确保警告不会太频繁
-        if alert_needed and (current_time - self.last_alert_time) > self.alert_cooldown:
-            self.alert_text = self.get_deepseek_alert(status)
-            self.last_alert_time = current_time
+        # 检测引擎已判定需要警告（含冷却时间）
+        if result is not None and result.alert_triggered:
+            self.alert_text = self.request_alert(status)
             self.play_sound_in_thread()
 
         info_text = (
@@ -189,131 +182,27 @@ class DrowsinessDetector(QMainWindow):
             f"<p style='color: {'red' if alert_needed else 'green'}; font-weight: bold;'>"
             f"⚠️ {self.alert_text if self.alert_text else '驾驶状态正常'}</p>"
             f"<p><b>🚗 车速:</b> {status['vehicle_speed']}</p>"
-            f"<p><b>👁️ 眨眼次数:</b> {self.blinks}</p>"
-            f"<p><b>💤 闭眼时长:</b> {round(self.microsleeps,2)} 秒</p>"
-            f"<p><b>😮 打哈欠次数:</b> {self.yawns}</p>"
-            f"<p><b>⏳ 当前哈欠持续时间:</b> {round(self.yawn_duration,2)} 秒</p>"
+            f"<p><b>👁️ 眨眼次数:</b> {self.stats.blinks}</p>"
+            f"<p><b>💤 闭眼时长:</b> {round(self.stats.microsleeps,2)} 秒</p>"
+            f"<p><b>😮 打哈欠次数:</b> {self.stats.yawns}</p>"
+            f"<p><b>⏳ 当前哈欠持续时间:</b> {round(self.stats.yawn_duration,2)} 秒</p>"
             f"<hr style='border: 1px solid #4CAF50;'>"
             f"</div>"
         )
         self.info_label.setText(info_text)
 
-    def predict_eye(self, eye_frame, eye_state):
-        results_eye = self.detecteye.predict(eye_frame)
-        boxes = results_eye[0].boxes
-        if len(boxes) == 0:
-            return eye_state
-
-        confidences = boxes.conf.cpu().numpy()  
-        class_ids = boxes.cls.cpu().numpy()  
-        max_confidence_index = np.argmax(confidences)
-        class_id = int(class_ids[max_confidence_index])
-
-        if class_id == 1 :
-            eye_state = "Close Eye"
-        elif class_id == 0 and confidences[max_confidence_index] > 0.30:
-            eye_state = "Open Eye"
-                            
-        return eye_state
-
-    def predict_yawn(self, yawn_frame):
-        results_yawn = self.detectyawn.predict(yawn_frame)
-        boxes = results_yawn[0].boxes
-
-        if len(boxes) == 0:
-            return self.yawn_state
-
-        confidences = boxes.conf.cpu().numpy()  
-        class_ids = boxes.cls.cpu().numpy()  
-        max_confidence_index = np.argmax(confidences)
-        class_id = int(class_ids[max_confidence_index])
-
-        if class_id == 0:
-            self.yawn_state = "Yawn"
-        elif class_id == 1 and confidences[max_confidence_index] > 0.50 :
-            self.yawn_state = "No Yawn"
-                            
-
-    def capture_frames(self):
-        while not self.stop_event.is_set():
-            ret, frame = self.cap.read()
-            if ret:
-                if self.frame_queue.qsize() < 2:
-                    self.frame_queue.put(frame)
-            else:
-                break
-
-    def process_frames(self):
-        while not self.stop_event.is_set():
-            try:
-                frame = self.frame_queue.get(timeout=1)        
-                image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                results = self.face_mesh.process(image_rgb)
-
-                if results.multi_face_landmarks:
-                    for face_landmarks in results.multi_face_landmarks:
-                        ih, iw, _ = frame.shape
-                        points = []
-
-                        for point_id in self.points_ids:
-                            lm = face_landmarks.landmark[point_id]
-                            x, y = int(lm.x * iw), int(lm.y * ih)
-                            points.append((x, y))
-
-                        if len(points) != 0:
-                            x1, y1 = points[0]  
-                            x2, _ = points[1]  
-                            _, y3 = points[2]  
-
-                            x4, y4 = points[3]  
-                            x5, y5 = points[4]  
-
-                            x6, y6 = points[5]  
-                            x7, y7 = points[6]  
-
-                            x6, x7 = min(x6, x7), max(x6, x7)
-                            y6, y7 = min(y6, y7), max(y6, y7)
-
-                            mouth_roi = frame[y1:y3, x1:x2]
-                            right_eye_roi = frame[y4:y5, x4:x5]
-                            left_eye_roi = frame[y6:y7, x6:x7]
-
-                            try:
-                                self.left_eye_state = self.predict_eye(left_eye_roi, self.left_eye_state)
-                                self.right_eye_state = self.predict_eye(right_eye_roi, self.right_eye_state)
-                                self.predict_yawn(mouth_roi)
-
-                            except Exception as e:
-                                print(f"Error al realizar la predicción: {e}")
-
-                            if self.left_eye_state == "Close Eye" and self.right_eye_state == "Close Eye":
-                                if not self.left_eye_still_closed and not self.right_eye_still_closed:
-                                    self.left_eye_still_closed, self.right_eye_still_closed = True , True
-                                    self.blinks += 1 
-                                self.microsleeps += 45 / 1000
-                            else:
-                                if self.left_eye_still_closed and self.right_eye_still_closed :
-                                    self.left_eye_still_closed, self.right_eye_still_closed = False , False
-                                self.microsleeps = 0
-
-                            if self.yawn_state == "Yawn":
-                                if not self.yawn_in_progress:
-                                    self.yawn_in_progress = True
-                                    self.yawns += 1  
-                                self.yawn_duration += 45 / 1000
-                            else:
-                                if self.yawn_in_progress:
-                                    self.yawn_in_progress = False
-                                    self.yawn_duration = 0
-
-                            self.update_info()
-                            self.display_frame(frame)
-
-            except queue.Empty:
-                continue
-
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                self.stop_event.set()
+    def on_frame_processed(self):
+        """显示检测引擎发布的最新一帧结果（主线程，经 frame_bridge 通知）"""
+        item = self.frame_bridge.slot.get_nowait()
+        if item is None:
+            return
+        frame, result = item
+        if not result.face_found:
+            return
+        self.is_drowsy = result.is_drowsy
+        self.update_info(result)
+        self.alert_prefetcher.update(self.vehicle_speed, result)
+        self.display_frame(frame)
 
     def display_frame(self, frame):
         rgb_image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
@@ -344,11 +233,7 @@ class DrowsinessDetector(QMainWindow):
 
     def check_alert_status(self):
         current_time = time.time()
-        alert_needed = (
-            round(self.yawn_duration, 2) > DROWSINESS_THRESHOLDS['yawn_duration_threshold'] or 
-            round(self.microsleeps, 2) > DROWSINESS_THRESHOLDS['microsleep_threshold'] or
-            self.yawns > DROWSINESS_THRESHOLDS['yawn_count_threshold']
-        )
+        alert_needed = self.is_drowsy
         
         if alert_needed and not self.alert_shown and (current_time - self.last_alert_box_time) > self.alert_box_cooldown:
             self.show_alert_dialog()
@@ -359,9 +244,9 @@ class DrowsinessDetector(QMainWindow):
 
     def show_alert_dialog(self):
         status = self.generate_status_report()
-        alert_message = self.get_deepseek_alert(status)
+        alert_message = self.request_alert(status)
         
-        msg = QMessageBox()
+        msg = QMessageBox(self)
         msg.setIcon(QMessageBox.Warning)
         msg.setWindowTitle("疲劳驾驶警告")
         msg.setText(alert_message)
@@ -402,13 +287,18 @@ class DrowsinessDetector(QMainWindow):
             }
         """)
         
-        # 在新线程中显示对话框
-        threading.Thread(target=lambda: msg.exec_()).start()
+        # 非模态显示，远程文本返回后在 on_alert_message 中更新
+        msg.setModal(False)
+        msg.show()
+        self.alert_dialog = msg
         self.play_sound_in_thread()
 
     def closeEvent(self, event):
-        self.stop_event.set()
+        self.pipeline.close()
+        if self.session_recorder is not None:
+            self.session_recorder.close()
         self.alert_timer.stop()
+        self.alert_service.stop()
         self.cap.release()
         event.accept()
 
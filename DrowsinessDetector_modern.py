@@ -5,14 +5,21 @@ import tkinter as tk
 from tkinter import ttk, messagebox, font
 import cv2
 import numpy as np
-from PIL import Image, ImageTk, ImageDraw, ImageFont
+from PIL import ImageDraw, ImageFont
 import threading
 import time
 import queue
 import winsound
-from ultralytics import YOLO
-from config import DEEPSEEK_API_CONFIG, DROWSINESS_THRESHOLDS, ALERT_CONFIG
-import requests
+from config import ALERT_CONFIG, SESSION_LOG_CONFIG, STAGED_CONFIG
+from detection_pipeline import DetectionPipeline, open_camera
+from metrics import log
+from alert_service import AlertService, AlertPrefetcher, MessageCache, status_signature
+from frame_display import TkVideoPanel
+from frame_capture import LatestFrameSlot
+from staged_pipeline import StagedRunner
+from fatigue_rules import DANGER, WARNING, NORMAL_VERDICT
+from frame_state import State, state_name
+from session_log import SessionRecorder
 import json
 import os
 
@@ -35,16 +42,20 @@ class ModernDrowsinessDetector:
         # 初始化变量
         self.running = False
         self.cap = None
-        self.frame_queue = queue.Queue(maxsize=5)
+        self.frame_slot = LatestFrameSlot()  # 只保留最新的已处理帧，界面来不及显示的直接丢弃
         self.current_frame = None
         self.detection_count = 0
         self.fps_counter = 0
-        self.last_alert_time = 0
-        self.alert_cooldown = DROWSINESS_THRESHOLDS['alert_cooldown']
         
         # 车辆状态
         self.vehicle_speed = 80  # 模拟车速
         
+        # DeepSeek 警告在后台请求（按驾驶状态缓存），文本经队列交给主线程显示
+        self.alert_service = AlertService(cache=MessageCache.from_config())
+        self.alert_queue = queue.Queue()
+        self.alert_window = None
+        self.alert_label = None
+        
         # 设计主题颜色
         self.colors = {
             'bg': '#0F0F10',
@@ -59,17 +70,21 @@ class ModernDrowsinessDetector:
             'border': '#2D2D30'
         }
         
+        # 检测引擎（无界面），界面只订阅其结果
+        self.pipeline = DetectionPipeline(mode="full", debug_mode=self.debug_mode)
+        self.pipeline.subscribe(self.on_frame_processed)
+        # 疲劳指标接近阈值时提前生成警告文本（读取流水线每帧的规则判定）
+        self.alert_prefetcher = AlertPrefetcher(
+            self.alert_service, "drowsy_brief", self.build_alert_prompt, max_tokens=50, timeout=3,
+            rules=self.pipeline.rules
+        )
+        # 定位、推理、统计、绘制分阶段并行执行
+        self.staged_runner = StagedRunner(self.pipeline) if STAGED_CONFIG['enabled'] else None
+        self.session_recorder = None  # 每次开始检测新建一个会话日志
+        
         # 检测状态变量
         self.reset_statistics()
         
-        # 状态标记
-        self.left_eye_state = "未检测"
-        self.right_eye_state = "未检测"
-        self.yawn_state = "未检测"
-        self.left_eye_still_closed = False
-        self.right_eye_still_closed = False
-        self.yawn_in_progress = False
-        
         # 加载模型
         self.load_models()
         
@@ -81,35 +96,15 @@ class ModernDrowsinessDetector:
         
     def reset_statistics(self):
         """重置所有统计数据"""
-        self.left_eye_state = "未检测"
-        self.right_eye_state = "未检测"
-        self.yawn_state = "未检测"
-        self.left_eye_still_closed = False
-        self.right_eye_still_closed = False
-        self.yawn_in_progress = False
-        self.blinks = 0
-        self.microsleeps = 0.0
-        self.yawns = 0
-        self.yawn_duration = 0.0
-        
-        # 新增：眨眼检测相关变量
-        self.blink_start_time = None
-        self.last_eye_open_time = time.time()
-        self.continuous_closed_time = 0.0
-        
+        self.pipeline.reset()
         self.detection_count = 0
         self.fps_counter = 0
         self.fps_start_time = None
-        self.last_alert_time = 0
-        self.alert_cooldown = DROWSINESS_THRESHOLDS['alert_cooldown']
         
     def load_models(self):
         """加载YOLO模型"""
         try:
-            print("🔄 正在加载AI模型...")
-            self.detectyawn = YOLO("runs/detectyawn/train/weights/best.pt")
-            self.detecteye = YOLO("runs/detecteye/train/weights/best.pt")
-            print("✅ AI模型加载成功！")
+            self.pipeline.load_models()
             self.model_loaded = True
         except Exception as e:
             print(f"❌ 模型加载失败: {e}")
@@ -249,6 +244,7 @@ class ModernDrowsinessDetector:
         
         self.video_label = tk.Label(video_container, bg="#000000")
         self.video_label.pack(fill=tk.BOTH, expand=True)
+        self.video_panel = TkVideoPanel(self.video_label)
         
         # 底部信息栏
         info_bar = tk.Frame(video_card, bg=self.colors['card_bg'], height=40)
@@ -515,22 +511,13 @@ class ModernDrowsinessDetector:
         """初始化摄像头"""
         try:
             # 尝试不同的摄像头索引
-            for i in range(4):
-                print(f"📷 尝试打开摄像头 {i}...")
-                self.cap = cv2.VideoCapture(i)
-                if self.cap.isOpened():
-                    # 设置摄像头参数
-                    self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-                    self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-                    self.cap.set(cv2.CAP_PROP_FPS, 30)
-                    print(f"✅ 摄像头 {i} 初始化成功")
-                    self.status_label.config(text="⚡ 摄像头就绪", fg=self.colors['success'])
-                    # 显示默认画面
-                    self.show_default_video()
-                    return
-                self.cap.release()
+            self.cap = open_camera(range(4), width=640, height=480, fps=30)
+            if self.cap is not None:
+                self.status_label.config(text="⚡ 摄像头就绪", fg=self.colors['success'])
+                # 显示默认画面
+                self.show_default_video()
+                return
                 
-            print("❌ 未找到可用摄像头")
             self.status_label.config(text="❌ 摄像头未连接", fg=self.colors['danger'])
             self.show_no_camera_message()
             
@@ -589,9 +576,16 @@ class ModernDrowsinessDetector:
         self.fps_start_time = time.time()
         self.fps_counter = 0
         
-        # 启动视频处理线程
-        self.video_thread = threading.Thread(target=self.video_loop, daemon=True)
-        self.video_thread.start()
+        # 状态变化和警告写入会话日志，供事后审计
+        if SESSION_LOG_CONFIG['enabled']:
+            self.session_recorder = SessionRecorder.open("drowsy")
+            self.pipeline.subscribe(self.session_recorder.on_result)
+
+        # 启动检测引擎（后台线程）
+        if self.staged_runner is not None:
+            self.staged_runner.start(self.cap, pace=0.020)  # 约50fps
+        else:
+            self.pipeline.start(self.cap, pace=0.020, stop_on_eof=False)  # 约50fps
         
         # 启动数据更新
         self.update_display()
@@ -601,12 +595,22 @@ class ModernDrowsinessDetector:
     def stop_detection(self):
         """停止检测"""
         self.running = False
+        self.stop_pipeline()
         self.start_button.config(state=tk.NORMAL)
         self.stop_button.config(state=tk.DISABLED)
         self.status_label.config(text="⚡ 系统就绪", fg=self.colors['success'])
         self.detection_indicator.config(text="● 待机中", fg=self.colors['text_secondary'])
         print("⏹️ 检测已停止")
         
+    def stop_pipeline(self):
+        if self.staged_runner is not None:
+            self.staged_runner.stop()
+        self.pipeline.stop()
+        if self.session_recorder is not None:
+            self.pipeline.unsubscribe(self.session_recorder.on_result)
+            self.session_recorder.close()
+            self.session_recorder = None
+        
     def reset_data(self):
         """重置数据"""
         self.reset_statistics()
@@ -614,71 +618,27 @@ class ModernDrowsinessDetector:
         self.update_status_display()
         print("🔄 数据已重置")
         
-    def video_loop(self):
-        """视频处理循环"""
-        while self.running:
-            try:
-                if self.cap and self.cap.isOpened():
-                    ret, frame = self.cap.read()
-                    if ret:
-                        # 存储当前帧
-                        self.current_frame = frame.copy()
-                        
-                        # 处理检测
-                        self.process_frame(frame)
-                        
-                        # 在帧上绘制信息
-                        self.draw_overlay(frame)
-                        
-                        # 将帧放入队列
-                        if not self.frame_queue.full():
-                            self.frame_queue.put(frame)
-                            
-                        # 更新FPS
-                        self.fps_counter += 1
-                        
-                    else:
-                        print("⚠️ 无法读取摄像头画面")
-                        time.sleep(0.1)
-                        
-                time.sleep(0.020)  # 提高处理速度，约50fps
-                
-            except Exception as e:
-                print(f"❌ 视频循环错误: {e}")
-                time.sleep(0.1)
-                
-    def process_frame(self, frame):
-        """处理单帧进行检测"""
-        try:
-            # 记录检测开始时间
-            start_time = time.time()
-            
-            # 眼睛检测 - 降低置信度阈值
-            print("👁️ 执行眼睛检测...")
-            eye_results = self.detecteye.predict(frame, verbose=False, conf=0.15)
-            self.process_eye_detection(eye_results)
-            
-            # 打哈欠检测 - 降低置信度阈值
-            print("🥱 执行打哈欠检测...")
-            yawn_results = self.detectyawn.predict(frame, verbose=False, conf=0.15)
-            self.process_yawn_detection(yawn_results)
-            
-            # 更新统计
-            self.update_statistics()
-            
-            # 更新检测计数
-            self.detection_count += 1
-            
-            # 记录检测时间
-            detection_time = time.time() - start_time
-            print(f"⏱️ 检测耗时: {detection_time:.3f}秒")
+    def on_frame_processed(self, frame, result):
+        """检测引擎的订阅回调（处理线程）：绘制覆盖信息并送入显示队列"""
+        # 存储当前帧
+        self.current_frame = frame.copy()
+        self.detection_count += 1
+        
+        # 在帧上绘制信息
+        self.draw_overlay(frame, result)
+        
+        # 放入显示缓冲（覆盖尚未显示的旧帧）
+        self.frame_slot.put(frame)
             
-        except Exception as e:
-            print(f"❌ 检测处理错误: {e}")
-            import traceback
-            traceback.print_exc()
+        # 更新FPS
+        self.fps_counter += 1
+        
+        if result.alert_triggered:
+            print("⚠️ 检测到疲劳状态！")
+            self.show_api_warning(result)
+        self.alert_prefetcher.update(self.vehicle_speed, result)
             
-    def draw_overlay(self, frame):
+    def draw_overlay(self, frame, result):
         """在帧上绘制覆盖信息"""
         h, w = frame.shape[:2]
         
@@ -688,8 +648,8 @@ class ModernDrowsinessDetector:
         cv2.addWeighted(overlay, 0.7, frame, 0.3, 0, frame)
         
         # 添加状态文字 - 更详细的显示
-        eye_display = self.left_eye_state if self.left_eye_state != "未检测" else "等待检测"
-        yawn_display = self.yawn_state if self.yawn_state != "未检测" else "等待检测"
+        eye_display = state_name(result.left_eye_state) if result.left_eye_state != State.UNKNOWN else "等待检测"
+        yawn_display = state_name(result.yawn_state) if result.yawn_state != State.UNKNOWN else "等待检测"
         status_text = f"眼睛: {eye_display} | 嘴部: {yawn_display}"
         cv2.putText(frame, status_text, (10, 25), 
                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
@@ -699,213 +659,48 @@ class ModernDrowsinessDetector:
         cv2.putText(frame, timestamp, (w-100, 25), 
                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
         
-    def process_eye_detection(self, results):
-        """处理眼睛检测结果"""
-        try:
-            if results and len(results) > 0 and results[0].boxes is not None:
-                boxes = results[0].boxes
-                if len(boxes) > 0:
-                    confidences = boxes.conf.cpu().numpy()
-                    class_ids = boxes.cls.cpu().numpy()
-                    
-                    # 打印所有检测结果（调试模式）
-                    if self.debug_mode:
-                        for i, (conf, cls) in enumerate(zip(confidences, class_ids)):
-                            print(f"  检测框{i}: class={int(cls)}, conf={conf:.3f}")
-                    
-                    # 获取最高置信度的检测结果
-                    max_confidence_index = np.argmax(confidences)
-                    class_id = int(class_ids[max_confidence_index])
-                    confidence = confidences[max_confidence_index]
-                    
-                    print(f"👁️ 眼睛检测: class={class_id}, conf={confidence:.2f}")
-                    
-                    # 进一步降低阈值，使检测更敏感
-                    # class=0 是闭眼，class=1 是睁眼
-                    if class_id == 0:  # 闭眼
-                        if confidence > 0.2:
-                            self.left_eye_state = self.right_eye_state = "闭眼"
-                            print("👁️ 检测到闭眼状态")
-                        elif confidence > 0.1:
-                            self.left_eye_state = self.right_eye_state = "疑似闭眼"
-                            print("👁️ 检测到疑似闭眼状态")
-                        else:
-                            # 即使置信度很低，如果检测到class=0，也认为是倾向闭眼
-                            self.left_eye_state = self.right_eye_state = "可能闭眼"
-                            print("👁️ 检测到可能闭眼状态（低置信度）")
-                    else:  # class=1 睁眼
-                        if confidence > 0.2:
-                            self.left_eye_state = self.right_eye_state = "睁眼"
-                        elif confidence > 0.1:
-                            self.left_eye_state = self.right_eye_state = "疑似睁眼"
-                        else:
-                            self.left_eye_state = self.right_eye_state = "可能睁眼"
-                else:
-                    print("👁️ 未检测到眼睛")
-                    self.left_eye_state = self.right_eye_state = "未检测"
-            else:
-                self.left_eye_state = self.right_eye_state = "未检测"
-                
-        except Exception as e:
-            print(f"❌ 眼睛检测处理错误: {e}")
-            import traceback
-            traceback.print_exc()
-            
-    def process_yawn_detection(self, results):
-        """处理打哈欠检测结果"""
-        try:
-            if results and len(results) > 0 and results[0].boxes is not None:
-                boxes = results[0].boxes
-                if len(boxes) > 0:
-                    confidences = boxes.conf.cpu().numpy()
-                    class_ids = boxes.cls.cpu().numpy()
-                    
-                    # 获取最高置信度的检测结果
-                    max_confidence_index = np.argmax(confidences)
-                    class_id = int(class_ids[max_confidence_index])
-                    confidence = confidences[max_confidence_index]
-                    
-                    print(f"🥱 打哈欠检测: class={class_id}, conf={confidence:.2f}")
-                    
-                    # 降低置信度阈值到0.3
-                    if class_id == 0 and confidence > 0.3:  # 打哈欠
-                        self.yawn_state = "打哈欠"
-                    elif class_id == 1 and confidence > 0.3:  # 不打哈欠
-                        self.yawn_state = "正常"
-                    else:
-                        # 如果置信度较低，根据类别给出倾向性判断
-                        if confidence > 0.2:
-                            if class_id == 0:
-                                self.yawn_state = "疑似打哈欠"
-                            else:
-                                self.yawn_state = "正常"
-                else:
-                    print("🥱 未检测到嘴部")
-                    self.yawn_state = "未检测"
-            else:
-                self.yawn_state = "未检测"
-                
-        except Exception as e:
-            print(f"❌ 打哈欠检测处理错误: {e}")
-            
-    def update_statistics(self):
-        """更新统计数据"""
-        print(f"📊 更新统计: 眼睛={self.left_eye_state}, 打哈欠={self.yawn_state}")
-        
-        # 眨眼和闭眼检测 - 增加对多种闭眼状态的处理
-        closed_states = ["闭眼", "疑似闭眼", "可能闭眼"]
-        if self.left_eye_state in closed_states and self.right_eye_state in closed_states:
-            if not self.left_eye_still_closed:
-                self.left_eye_still_closed = True
-                self.blinks += 1
-                print(f"👁️ 眨眼次数: {self.blinks}")
-            
-            # 根据闭眼状态的确定性，调整累积速度
-            if self.left_eye_state == "闭眼":
-                self.microsleeps += 0.06  # 确定闭眼，快速累积
-            elif self.left_eye_state == "疑似闭眼":
-                self.microsleeps += 0.04  # 疑似闭眼，中速累积
-            else:  # 可能闭眼
-                self.microsleeps += 0.02  # 可能闭眼，慢速累积
-                
-            print(f"😴 累计闭眼时间: {self.microsleeps:.2f}秒")
-        else:
-            self.left_eye_still_closed = False
-            # 逐渐减少闭眼时间
-            if self.microsleeps > 0:
-                self.microsleeps = max(0, self.microsleeps - 0.02)
-            
-        # 打哈欠检测 - 增加对"疑似打哈欠"的处理
-        if self.yawn_state in ["打哈欠", "疑似打哈欠"]:
-            if not self.yawn_in_progress:
-                self.yawn_in_progress = True
-                self.yawns += 1
-                print(f"🥱 打哈欠次数: {self.yawns}")
-            # 增加打哈欠时间累积速度
-            self.yawn_duration += 0.05  # 从0.04增加到0.05
-            print(f"🥱 打哈欠持续时间: {self.yawn_duration:.2f}秒")
-        else:
-            self.yawn_in_progress = False
-            if self.yawn_duration > 0:
-                self.yawn_duration = max(0, self.yawn_duration - 0.02)
-            
-        # 检查疲劳等级
-        self.check_fatigue_level()
-        
-        # 如果在调试模式，打印更多信息
-        if self.debug_mode and (self.blinks > 0 or self.microsleeps > 0):
-            print(f"📊 当前统计: 眨眼={self.blinks}次, 闭眼={self.microsleeps:.2f}秒, 打哈欠={self.yawns}次")
-        
-    def check_fatigue_level(self):
-        """检查疲劳等级并发出警告"""
-        current_time = time.time()
-        
-        is_drowsy = (
-            self.microsleeps > DROWSINESS_THRESHOLDS['microsleep_threshold'] or
-            self.yawn_duration > DROWSINESS_THRESHOLDS['yawn_duration_threshold'] or
-            self.yawns > DROWSINESS_THRESHOLDS['yawn_count_threshold']
-        )
+    def build_alert_prompt(self, microsleeps, yawns, yawn_duration):
+        """根据疲劳统计生成提示词"""
+        # 生成状态报告
+        status = {
+            "vehicle_speed": f"{self.vehicle_speed} km/h",
+            "drowsiness_detected": "是",
+            "drowsiness_details": f"闭眼{microsleeps:.1f}秒，打哈欠{yawns}次",
+            "yawning_duration": f"{yawn_duration:.1f}秒"
+        }
         
-        if is_drowsy and (current_time - self.last_alert_time) > self.alert_cooldown:
-            print("⚠️ 检测到疲劳状态！")
-            self.show_api_warning()
-            self.last_alert_time = current_time
-            
-    def show_api_warning(self):
-        """显示基于API的智能警告"""
-        try:
-            # 生成状态报告
-            status = {
-                "vehicle_speed": f"{self.vehicle_speed} km/h",
-                "drowsiness_detected": "是",
-                "drowsiness_details": f"闭眼{self.microsleeps:.1f}秒，打哈欠{self.yawns}次",
-                "yawning_duration": f"{self.yawn_duration:.1f}秒"
-            }
-            
-            # 调用API获取警告
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {DEEPSEEK_API_CONFIG['api_key']}"
-            }
-            
-            prompt = f"""
-            驾驶员疲劳状态报告：
-            - 车速: {status['vehicle_speed']}
-            - 疲劳检测: {status['drowsiness_detected']}
-            - 详情: {status['drowsiness_details']}
-            - 打哈欠持续: {status['yawning_duration']}
-            
-            请生成一个简洁有力的安全提醒(不超过30字)。
-            """
-            
-            response = requests.post(
-                DEEPSEEK_API_CONFIG['api_endpoint'],
-                headers=headers,
-                json={
-                    "model": "deepseek-chat",
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": 0.7,
-                    "max_tokens": 50
-                },
-                timeout=3
-            )
-            
-            if response.status_code == 200:
-                message = response.json()["choices"][0]["message"]["content"]
-            else:
-                message = "检测到疲劳状态，请立即休息！"
-                
-        except:
-            message = "⚠️ 疲劳驾驶警告！请立即停车休息！"
-            
-        # 显示弹窗
-        self.show_modern_alert(message)
+        return f"""
+        驾驶员疲劳状态报告：
+        - 车速: {status['vehicle_speed']}
+        - 疲劳检测: {status['drowsiness_detected']}
+        - 详情: {status['drowsiness_details']}
+        - 打哈欠持续: {status['yawning_duration']}
+        
+        请生成一个简洁有力的安全提醒(不超过30字)。
+        """
+        
+    def show_api_warning(self, result):
+        """显示基于API的智能警告（不阻塞检测线程）"""
+        prompt = self.build_alert_prompt(result.microsleeps, result.yawns, result.yawn_duration)
+        
+        # 优先使用缓存的提醒；未命中时先显示本地提示，API返回后替换为智能提醒
+        fallback = "⚠️ 疲劳驾驶警告！请立即停车休息！"
+        signature = status_signature(self.vehicle_speed, result.microsleeps,
+                                     result.yawns, result.yawn_duration)
+        self.alert_queue.put(self.alert_service.submit(
+            "drowsy_brief", prompt, fallback, self.alert_queue.put,
+            max_tokens=50, timeout=3, signature=signature
+        ))
         
         # 播放警告音
         threading.Thread(target=self.play_alert_sound, daemon=True).start()
         
     def show_modern_alert(self, message):
-        """显示现代化的警告弹窗"""
+        """显示现代化的警告弹窗（主线程），弹窗仍在时只更新文字"""
+        if self.alert_window is not None and self.alert_window.winfo_exists():
+            self.alert_label.config(text=message)
+            return
+            
         alert = tk.Toplevel(self.root)
         alert.title("⚠️ 安全警告")
         alert.geometry("350x180")  # 缩小窗口尺寸
@@ -933,14 +728,15 @@ class ModernDrowsinessDetector:
         ).pack()
         
         # 警告消息
-        tk.Label(
+        self.alert_label = tk.Label(
             content_frame,
             text=message,
             font=font.Font(size=14),  # 缩小字体
             fg='white',
             bg=self.colors['danger'],
             wraplength=320
-        ).pack(pady=10)
+        )
+        self.alert_label.pack(pady=10)
         
         # 确认按钮
         tk.Button(
@@ -957,6 +753,7 @@ class ModernDrowsinessDetector:
         
         # 自动关闭
         alert.after(4000, alert.destroy)  # 缩短自动关闭时间
+        self.alert_window = alert
         
     def play_alert_sound(self):
         """播放警告音"""
@@ -969,14 +766,18 @@ class ModernDrowsinessDetector:
             
     def update_display(self):
         """更新显示（主线程）"""
+        # 显示警告服务送来的提示
+        while True:
+            try:
+                self.show_modern_alert(self.alert_queue.get_nowait())
+            except queue.Empty:
+                break
+                
         if self.running:
             # 更新视频
-            if not self.frame_queue.empty():
-                try:
-                    frame = self.frame_queue.get_nowait()
-                    self.display_frame(frame)
-                except queue.Empty:
-                    pass
+            frame = self.frame_slot.get_nowait()
+            if frame is not None:
+                self.display_frame(frame)
                     
             # 更新状态 - 确保总是更新
             self.update_status_display()
@@ -999,15 +800,18 @@ class ModernDrowsinessDetector:
                 
     def update_status_display(self):
         """更新状态显示"""
+        stats = self.pipeline.stats
+        # 疲劳等级由检测引擎每帧评估一次，这里只读取最新的判定
+        result = self.pipeline.latest_result
+        verdict = result.verdict if result is not None else NORMAL_VERDICT
+        
         # 更新疲劳等级
-        if (self.microsleeps > DROWSINESS_THRESHOLDS['microsleep_threshold'] or
-            self.yawn_duration > DROWSINESS_THRESHOLDS['yawn_duration_threshold'] or
-            self.yawns > DROWSINESS_THRESHOLDS['yawn_count_threshold']):
+        if verdict.level == DANGER:
             self.fatigue_label.config(text="危险", fg=self.colors['danger'])
             # 更新等级条
             for i, indicator in enumerate(self.level_indicators):
                 indicator.config(bg=self.colors['danger'] if i <= 2 else self.colors['border'])
-        elif self.microsleeps > 1 or self.yawns > 1:
+        elif verdict.level == WARNING:
             self.fatigue_label.config(text="警告", fg=self.colors['warning'])
             # 更新等级条
             for i, indicator in enumerate(self.level_indicators):
@@ -1019,46 +823,20 @@ class ModernDrowsinessDetector:
                 indicator.config(bg=self.colors['success'] if i == 0 else self.colors['border'])
             
         # 更新统计数据
-        self.stats_cards['blinks']['value_label'].config(text=f"{self.blinks} 次")
-        self.stats_cards['microsleeps']['value_label'].config(text=f"{self.microsleeps:.2f} 秒")
-        self.stats_cards['yawns']['value_label'].config(text=f"{self.yawns} 次")
-        self.stats_cards['yawn_duration']['value_label'].config(text=f"{self.yawn_duration:.2f} 秒")
+        self.stats_cards['blinks']['value_label'].config(text=f"{stats.blinks} 次")
+        self.stats_cards['microsleeps']['value_label'].config(text=f"{stats.microsleeps:.2f} 秒")
+        self.stats_cards['yawns']['value_label'].config(text=f"{stats.yawns} 次")
+        self.stats_cards['yawn_duration']['value_label'].config(text=f"{stats.yawn_duration:.2f} 秒")
         
         # 更新检测计数
         self.detection_count_label.config(text=f"检测次数: {self.detection_count}")
         
     def display_frame(self, frame):
-        """显示视频帧"""
+        """显示视频帧（缩放到面板大小，复用缓冲区和 PhotoImage）"""
         try:
-            # 调整大小以适应显示区域
-            height, width = frame.shape[:2]
-            
-            # 计算缩放比例
-            label_width = self.video_label.winfo_width()
-            label_height = self.video_label.winfo_height()
-            
-            if label_width > 1 and label_height > 1:
-                scale = min(label_width/width, label_height/height) * 0.95
-                new_width = int(width * scale)
-                new_height = int(height * scale)
-                
-                frame = cv2.resize(frame, (new_width, new_height))
-            
-            # 转换颜色空间
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
-            # 转换为PIL图像
-            pil_image = Image.fromarray(frame_rgb)
-            
-            # 转换为tkinter格式
-            photo = ImageTk.PhotoImage(pil_image)
-            
-            # 更新显示
-            self.video_label.config(image=photo)
-            self.video_label.image = photo
-            
+            self.video_panel.show(frame)
         except Exception as e:
-            print(f"❌ 显示帧错误: {e}")
+            log.info("display_error", "❌ 显示帧错误: {}", e)
             
     def update_time(self):
         """更新时间显示"""
@@ -1069,6 +847,9 @@ class ModernDrowsinessDetector:
     def on_closing(self):
         """关闭窗口时的处理"""
         self.running = False
+        self.stop_pipeline()
+        self.pipeline.close()
+        self.alert_service.stop()
         if self.cap:
             self.cap.release()
         self.root.destroy()
@@ -6,8 +6,9 @@ from tkinter import ttk, messagebox, font
 import threading
 import time
 import os
+from fatigue_rules import FatigueRules
 
-# 简化的配置
+# 简化的配置（模拟数据用的演示阈值，没有 PERCLOS 规则）
 SIMPLE_CONFIG = {
     'microsleep_threshold': 1.0,
     'yawn_duration_threshold': 1.5,
@@ -45,6 +46,8 @@ class SimpleDrowsinessDetector:
         self.yawns = 0
         self.yawn_duration = 0.0
         self.last_alert_time = 0
+        # 与完整版使用同一份疲劳规则，阈值用演示配置
+        self.rules = FatigueRules(SIMPLE_CONFIG)
         
         # 检查依赖
         self.check_dependencies()
@@ -374,10 +377,7 @@ class SimpleDrowsinessDetector:
             self.stats_labels['yawn_duration'].config(text=f"{self.yawn_duration:.1f} 秒")
             
         # 检查疲劳状态
-        if (self.microsleeps > SIMPLE_CONFIG['microsleep_threshold'] or
-            self.yawn_duration > SIMPLE_CONFIG['yawn_duration_threshold'] or
-            self.yawns > SIMPLE_CONFIG['yawn_count_threshold']):
-            
+        if self.rules.evaluate(self).is_drowsy:
             current_time = time.time()
             if current_time - self.last_alert_time > SIMPLE_CONFIG['alert_cooldown']:
                 self.show_alert()
@@ -0,0 +1,81 @@
+"""
+合并眼睛数据集和打哈欠数据集，生成统一的4类数据集（dataset_unified.yaml）
+
+类别编号：
+    眼睛数据集  0: open eye   1: close eye  → 保持 0, 1
+    哈欠数据集  0: yawn       1: no yawn    → 改为 2, 3
+
+两个数据集需采用 YOLO 目录结构：<root>/images/{train,val} 与 <root>/labels/{train,val}。
+注意：单独标注的图片中另一类目标没有标签（例如眼睛图片里的嘴巴），
+若条件允许，最好在同一批图片上同时标注眼睛和嘴部（见 AutoLabelling.py）。
+"""
+import os
+import shutil
+
+
+class MergeDatasets:
+    def __init__(self, eye_root: str = 'datasets', yawn_root: str = 'datasets_yawn',
+                 out_root: str = 'datasets_unified'):
+        self.eye_root: str = eye_root
+        self.yawn_root: str = yawn_root
+        self.out_root: str = out_root
+        self.splits: tuple = ('train', 'val')
+
+        # 源数据集前缀和类别偏移量
+        self.sources: list = [
+            ('eye', self.eye_root, 0),
+            ('yawn', self.yawn_root, 2),
+        ]
+
+    def remap_label(self, src_txt: str, dst_txt: str, offset: int):
+        """复制标签文件并给类别编号加上偏移量"""
+        lines = []
+        with open(src_txt, 'r') as f:
+            for line in f:
+                parts = line.split()
+                if not parts:
+                    continue
+                parts[0] = str(int(parts[0]) + offset)
+                lines.append(' '.join(parts))
+        with open(dst_txt, 'w') as f:
+            f.write('\n'.join(lines) + ('\n' if lines else ''))
+
+    def merge_split(self, split: str) -> int:
+        out_images = os.path.join(self.out_root, 'images', split)
+        out_labels = os.path.join(self.out_root, 'labels', split)
+        os.makedirs(out_images, exist_ok=True)
+        os.makedirs(out_labels, exist_ok=True)
+
+        count = 0
+        for prefix, root, offset in self.sources:
+            image_dir = os.path.join(root, 'images', split)
+            label_dir = os.path.join(root, 'labels', split)
+            if not os.path.isdir(image_dir):
+                print(f'⚠️ 跳过不存在的目录: {image_dir}')
+                continue
+
+            for name in sorted(os.listdir(image_dir)):
+                stem, ext = os.path.splitext(name)
+                # 加前缀避免两个数据集的文件重名
+                out_stem = f'{prefix}_{stem}'
+                shutil.copy2(os.path.join(image_dir, name), os.path.join(out_images, out_stem + ext))
+
+                src_txt = os.path.join(label_dir, stem + '.txt')
+                dst_txt = os.path.join(out_labels, out_stem + '.txt')
+                if os.path.exists(src_txt):
+                    self.remap_label(src_txt, dst_txt, offset)
+                else:
+                    # 没有标签的图片作为负样本
+                    open(dst_txt, 'w').close()
+                count += 1
+        return count
+
+    def main(self):
+        for split in self.splits:
+            count = self.merge_split(split)
+            print(f'{split}: {count} images -> {self.out_root}')
+
+
+if __name__ == '__main__':
+    merge = MergeDatasets()
+    merge.main()
@@ -0,0 +1,284 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+警告文本生成后端
+
+所有后端都提供 generate(prompt, max_tokens, timeout) -> str，失败时抛出异常：
+- HttpChatBackend：带连接池的长连接 HTTP 客户端，调用 chat-completions 接口，
+  避免每次警告都重新建立 TCP/TLS 连接
+- TemplateBackend：离线模板，同一提示词总是得到同一条提醒，无需网络
+- mock：在本机启动 MockChatServer（按 chat-completions 格式返回模板文本），
+  再用 HttpChatBackend 连接它，便于在没有网络的机器上压测警告链路
+
+    python alert_backend.py serve --port 8765 --latency 0.5   # 单独运行模拟服务器
+    python alert_backend.py bench --backend mock --latency 0.5 # 压测警告链路
+
+bench 模拟一段驾驶的疲劳指标，像界面一样经 AlertService 提交警告（合并重复请求、
+MessageCache、AlertPrefetcher 预取），统计从提交到拿到提醒文本的延迟。
+"""
+import argparse
+import json
+import threading
+import time
+import zlib
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import ALERT_BACKEND_CONFIG, DEEPSEEK_API_CONFIG
+
+ALERT_TEMPLATES = (
+    "检测到疲劳迹象，请尽快在安全地点停车休息。",
+    "您已出现闭眼和打哈欠，建议在下一个服务区休息片刻。",
+    "请保持专注，如感觉困倦请及时停车休息。",
+    "疲劳驾驶十分危险，请减速并寻找安全地点休息。",
+    "请注意行车安全，适当开窗通风或停车休息。",
+)
+
+
+class HttpChatBackend:
+    """复用 requests.Session 的 chat-completions 客户端"""
+
+    def __init__(self, endpoint, api_key, model="deepseek-chat", pool_size=4):
+        self.endpoint = endpoint
+        self.model = model
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}"
+        })
+
+    def generate(self, prompt, max_tokens=100, timeout=5):
+        response = self.session.post(
+            self.endpoint,
+            json={
+                "model": self.model,
+                "messages": [{"role": "user", "content": prompt}],
+                "temperature": 0.7,
+                "max_tokens": max_tokens
+            },
+            timeout=timeout
+        )
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"]
+
+    def close(self):
+        self.session.close()
+
+
+class TemplateBackend:
+    """按提示词的哈希从模板中选一条，结果确定、可重复"""
+
+    def __init__(self, templates=ALERT_TEMPLATES):
+        self.templates = templates
+
+    def generate(self, prompt, max_tokens=100, timeout=5):
+        return self.templates[zlib.crc32(prompt.encode('utf-8')) % len(self.templates)]
+
+    def close(self):
+        pass
+
+
+class MockChatServer:
+    """本地模拟的 chat-completions 服务器，回复由 TemplateBackend 生成"""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0):
+        generator = TemplateBackend()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # 支持长连接
+            disable_nagle_algorithm = True  # 头部和正文分两次写出，避免长连接下的延迟确认
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                try:
+                    request = json.loads(self.rfile.read(length))
+                    prompt = request["messages"][-1]["content"]
+                except (ValueError, KeyError, IndexError):
+                    self.send_error(400, "invalid chat-completions request")
+                    return
+                if latency > 0:
+                    time.sleep(latency)
+                body = json.dumps({
+                    "id": "mock",
+                    "object": "chat.completion",
+                    "model": request.get("model", "mock"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": generator.generate(prompt)},
+                        "finish_reason": "stop"
+                    }]
+                }, ensure_ascii=False).encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def endpoint(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class MockBackend(HttpChatBackend):
+    """启动进程内模拟服务器并通过 HTTP 连接它，走完整的网络链路"""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, pool_size=4):
+        self.server = MockChatServer(host, port, latency).start()
+        super().__init__(self.server.endpoint, "mock", pool_size=pool_size)
+
+    def close(self):
+        super().close()
+        self.server.stop()
+
+
+def load_alert_backend(backend=None):
+    """按 ALERT_BACKEND_CONFIG 创建警告文本后端"""
+    cfg = ALERT_BACKEND_CONFIG
+    backend = backend or cfg['backend']
+    if backend == "http":
+        return HttpChatBackend(DEEPSEEK_API_CONFIG['api_endpoint'], DEEPSEEK_API_CONFIG['api_key'],
+                               pool_size=cfg['pool_size'])
+    if backend == "template":
+        return TemplateBackend()
+    if backend == "mock":
+        # 端口0由系统分配，避免与单独运行的模拟服务器冲突
+        return MockBackend(cfg['mock_host'], 0, cfg['mock_latency'], cfg['pool_size'])
+    raise ValueError(f"未知的警告后端: {backend}")
+
+
+def simulated_status(t, period=8.0):
+    """模拟的驾驶状态：每 period 秒中后5秒闭眼，每20秒多打一次哈欠，车速每30秒变化"""
+    phase = t % period
+    microsleeps = max(0.0, phase - (period - 5.0))
+    yawns = int(t // 20) % 7
+    speed = 100 + 20 * (int(t // 30) % 3)
+    return speed, microsleeps, yawns, 0.0
+
+
+def benchmark_alerts(backend, seconds=60.0, fps=30, speedup=10.0, use_cache=True):
+    """
+    按 fps 逐帧模拟 seconds 秒的驾驶（按 speedup 倍速运行），每帧更新预取，
+    疲劳指标越过阈值的每一帧都提交一次警告，返回每次提交拿到提醒文本的延迟（秒）
+    """
+    from alert_service import AlertPrefetcher, AlertService, MessageCache, status_signature
+    from config import ALERT_CACHE_CONFIG, DROWSINESS_THRESHOLDS
+
+    def prompt(microsleeps, yawns, yawn_duration):
+        return f"驾驶员状态汇报：闭眼{microsleeps:.0f}秒，打哈欠{yawns}次，哈欠持续{yawn_duration:.0f}秒"
+
+    # 缓存只放在内存中，不影响界面使用的持久化文件
+    cache = MessageCache(dict(ALERT_CACHE_CONFIG, path=None)) if use_cache else None
+    service = AlertService(backend, cache=cache)
+    prefetcher = AlertPrefetcher(service, "drowsy", prompt)
+    latencies = []
+    outstanding = []
+    lock = threading.Lock()
+
+    def waiter(start):
+        done = threading.Event()
+
+        def on_message(message):
+            with lock:
+                latencies.append(time.perf_counter() - start)
+            done.set()
+        return on_message, done
+
+    threshold = DROWSINESS_THRESHOLDS['microsleep_threshold']
+    frame_time = 1.0 / fps
+    try:
+        for frame in range(int(seconds * fps)):
+            speed, microsleeps, yawns, yawn_duration = simulated_status(frame * frame_time)
+            prefetcher.update(speed, SimpleNamespace(microsleeps=microsleeps, yawns=yawns,
+                                                     yawn_duration=yawn_duration, perclos=0.0))
+            if microsleeps > threshold:
+                start = time.perf_counter()
+                callback, done = waiter(start)
+                fallback = "请注意休息"
+                message = service.submit(
+                    "drowsy", prompt(microsleeps, yawns, yawn_duration), fallback, callback,
+                    signature=status_signature(speed, microsleeps, yawns, yawn_duration))
+                if message is not fallback:
+                    with lock:
+                        latencies.append(time.perf_counter() - start)  # 缓存命中，立即可用
+                else:
+                    outstanding.append(done)
+            time.sleep(frame_time / speedup)
+        for done in outstanding:
+            done.wait(timeout=10)
+    finally:
+        service.stop()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="警告文本后端：运行本地模拟服务器或压测警告链路")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="运行 chat-completions 模拟服务器")
+    serve.add_argument("--host", default=ALERT_BACKEND_CONFIG['mock_host'])
+    serve.add_argument("--port", type=int, default=ALERT_BACKEND_CONFIG['mock_port'])
+    serve.add_argument("--latency", type=float, default=ALERT_BACKEND_CONFIG['mock_latency'])
+    bench = sub.add_parser("bench", help="经警告服务模拟一段驾驶的警告并统计延迟")
+    bench.add_argument("--backend", choices=("http", "template", "mock"), default="mock")
+    bench.add_argument("--latency", type=float, default=ALERT_BACKEND_CONFIG['mock_latency'],
+                       help="mock 后端每次响应的延迟（秒）")
+    bench.add_argument("--seconds", type=float, default=60.0, help="模拟的驾驶时长（秒）")
+    bench.add_argument("--fps", type=int, default=30)
+    bench.add_argument("--speedup", type=float, default=10.0, help="模拟的倍速")
+    bench.add_argument("--no-cache", action="store_true", help="不使用 MessageCache 和预取")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        server = MockChatServer(args.host, args.port, args.latency)
+        print(f"🖥️ 模拟服务器: {server.endpoint}（Ctrl+C 退出）")
+        try:
+            server.server.serve_forever()
+        except KeyboardInterrupt:
+            server.server.server_close()
+        return
+
+    from metrics import REGISTRY
+
+    cfg = ALERT_BACKEND_CONFIG
+    if args.backend == "mock":
+        backend = MockBackend(cfg['mock_host'], 0, args.latency, cfg['pool_size'])
+    else:
+        backend = load_alert_backend(args.backend)
+    latencies = benchmark_alerts(backend, args.seconds, args.fps, args.speedup, not args.no_cache)
+    if not latencies:
+        print("⚠️ 模拟过程中没有触发警告")
+        return
+    ms = np.asarray(latencies) * 1000.0
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    counters = REGISTRY.snapshot()['counters']
+    print(f"📊 {args.backend}: {len(ms)} 次警告, 拿到提醒文本 p50 {p50:.2f}ms, p95 {p95:.2f}ms, p99 {p99:.2f}ms")
+    print(f"   后端请求 {counters.get('alert.requests', 0)} 次, 合并 {counters.get('alert.coalesced', 0)} 次, "
+          f"缓存命中 {counters.get('alert.cache_hits', 0)} 次, 未命中 {counters.get('alert.cache_misses', 0)} 次, "
+          f"预取 {counters.get('alert.prefetches', 0)} 次, 丢弃 {counters.get('alert.dropped', 0)} 次")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+异步警告服务
+
+DeepSeek 请求可能要几秒，不能在检测线程或界面线程里同步等待。触发警告时：
+- submit 立即返回本地兜底提示，界面马上就能显示
+- 请求放入队列由后台线程发送；同一 key 的请求尚未完成时再次触发，
+  只更新待发送的内容并合并回调，不会重复请求
+- 远程文本返回后交给回调（回调在后台线程执行，界面需自行切回主线程）
+- 文本由 alert_backend 中的后端生成（DeepSeek长连接 / 离线模板 / 本地模拟服务器）
+
+提示词只由车速、闭眼时长、打哈欠次数/时长决定，状态空间很小。
+传入 signature（量化后的状态）时先查 MessageCache：命中直接返回缓存的提醒，
+条目变旧或变体不足时在后台重新生成，网络慢或断开时警告照常可用。
+AlertPrefetcher 在疲劳指标接近阈值时就按越过阈值时的状态提前生成提醒，
+状态回落或变化后丢弃尚未发出的预取请求。
+
+    service = AlertService(cache=MessageCache.from_config())
+    signature = status_signature(speed, microsleeps, yawns, yawn_duration)
+    text = service.submit("drowsy", prompt, "请注意休息", on_message, signature=signature)
+"""
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+from alert_backend import load_alert_backend
+from config import ALERT_CACHE_CONFIG
+from fatigue_rules import FatigueRules
+from metrics import REGISTRY, log
+
+
+def status_signature(speed, microsleeps, yawns, yawn_duration, config=None):
+    """把驾驶状态量化为缓存键，相近的状态共用同一组提醒"""
+    config = config or ALERT_CACHE_CONFIG
+    return "{}|{}|{}|{}".format(
+        int(speed // config['speed_step']),
+        int(microsleeps // config['microsleep_step']),
+        min(int(yawns), config['max_yawn_count']),
+        int(yawn_duration // config['yawn_duration_step']),
+    )
+
+
+class MessageCache:
+    """
+    状态签名 -> 若干条已生成的提醒。按 LRU 淘汰，超过 ttl 的条目作废，
+    可选持久化为 JSON 文件，程序重启后直接可用。
+    """
+
+    def __init__(self, config=None):
+        config = config or ALERT_CACHE_CONFIG
+        self.path = config['path']
+        self.ttl = config['ttl']
+        self.refresh_after = config['refresh_after']
+        self.max_entries = config['max_entries']
+        self.max_variants = config['max_variants']
+        self.entries = OrderedDict()  # key -> {'messages': [...], 'updated': 时间戳, 'next': 轮换位置}
+        self.lock = threading.Lock()
+        self.load()
+
+    @classmethod
+    def from_config(cls, config=None):
+        config = config or ALERT_CACHE_CONFIG
+        return cls(config) if config['enabled'] else None
+
+    def get(self, key, now=None):
+        """返回 (提醒或None, 是否需要后台刷新)"""
+        now = time.time() if now is None else now
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None, True
+            age = now - entry['updated']
+            if age > self.ttl:
+                del self.entries[key]
+                return None, True
+            self.entries.move_to_end(key)
+            messages = entry['messages']
+            message = messages[entry['next'] % len(messages)]
+            entry['next'] += 1
+            stale = age > self.refresh_after or len(messages) < self.max_variants
+            return message, stale
+
+    def contains(self, key, now=None):
+        """是否有未过期的条目（不影响轮换和 LRU 顺序）"""
+        now = time.time() if now is None else now
+        with self.lock:
+            entry = self.entries.get(key)
+            return entry is not None and now - entry['updated'] <= self.ttl
+
+    def put(self, key, message, now=None):
+        now = time.time() if now is None else now
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.entries[key] = {'messages': [], 'updated': now, 'next': 0}
+            if message not in entry['messages']:
+                entry['messages'].append(message)
+                del entry['messages'][:-self.max_variants]
+            entry['updated'] = now
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            snapshot = json.dumps(self.entries, ensure_ascii=False, indent=2) if self.path else None
+        if snapshot is not None:
+            self.save(snapshot)
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 警告缓存读取失败: {e}")
+            return
+        now = time.time()
+        for key, entry in sorted(entries.items(), key=lambda item: item[1]['updated']):
+            if now - entry['updated'] <= self.ttl and entry['messages']:
+                self.entries[key] = {'messages': entry['messages'][-self.max_variants:],
+                                     'updated': entry['updated'], 'next': 0}
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def save(self, snapshot):
+        # 先写临时文件再替换，避免中途退出留下损坏的缓存
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(snapshot)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log.info("alert_cache_error", "⚠️ 警告缓存保存失败: {}", e)
+
+
+class AlertRequest:
+    def __init__(self, key, prompt, fallback, max_tokens, timeout, cache_key=None):
+        self.key = key
+        self.prompt = prompt
+        self.fallback = fallback
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+        self.cache_key = cache_key
+        self.callbacks = []
+        self.started = False
+        self.cancelled = False
+
+
+class AlertService:
+    def __init__(self, backend=None, max_pending=8, cache=None):
+        self.backend = backend or load_alert_backend()
+        self.cache = cache
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.pending = {}  # key -> 排队中或发送中的请求
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+        self.requests_counter = REGISTRY.counter("alert.requests")
+        self.coalesced_counter = REGISTRY.counter("alert.coalesced")
+        self.dropped_counter = REGISTRY.counter("alert.dropped")
+        self.failures_counter = REGISTRY.counter("alert.failures")
+        self.latency_histogram = REGISTRY.histogram("alert.latency")
+        self.cache_hits_counter = REGISTRY.counter("alert.cache_hits")
+        self.cache_misses_counter = REGISTRY.counter("alert.cache_misses")
+        self.prefetch_counter = REGISTRY.counter("alert.prefetches")
+        self.prefetch_dropped_counter = REGISTRY.counter("alert.prefetches_dropped")
+
+    def submit(self, key, prompt, fallback, callback, max_tokens=100, timeout=5, signature=None):
+        """
+        提交一次警告，立即返回可显示的文本：缓存命中时为缓存的提醒，
+        否则为兜底文本，远程文本就绪后再调用 callback(message)
+        """
+        if self.cache is not None and signature is not None:
+            cache_key = f"{key}|{signature}"
+            cached, stale = self.cache.get(cache_key)
+            if cached is not None:
+                self.cache_hits_counter.inc()
+                if stale:
+                    # 后台刷新只更新缓存，不替换已显示的提醒
+                    self.enqueue(cache_key, prompt, fallback, None, max_tokens, timeout, cache_key)
+                return cached
+            self.cache_misses_counter.inc()
+            # 同一状态的预取还在进行时直接等它的结果
+            if not self.attach(cache_key, callback):
+                self.enqueue(key, prompt, fallback, callback, max_tokens, timeout, cache_key)
+        else:
+            self.enqueue(key, prompt, fallback, callback, max_tokens, timeout)
+        return fallback
+
+    def prefetch(self, key, prompt, signature, max_tokens=100, timeout=5):
+        """提前为某个状态生成提醒并写入缓存，返回可用于 cancel 的请求 key"""
+        if self.cache is None:
+            return None
+        cache_key = f"{key}|{signature}"
+        if not self.cache.contains(cache_key):
+            self.prefetch_counter.inc()
+            self.enqueue(cache_key, prompt, "", None, max_tokens, timeout, cache_key)
+        return cache_key
+
+    def attach(self, key, callback):
+        """把回调挂到进行中的同 key 请求上，没有这样的请求返回 False"""
+        with self.lock:
+            request = self.pending.get(key)
+            if request is None:
+                return False
+            if callback is not None and callback not in request.callbacks:
+                request.callbacks.append(callback)
+            self.coalesced_counter.inc()
+            return True
+
+    def cancel(self, key):
+        """丢弃尚未发出、也没有界面在等待的请求（过时的预取）"""
+        with self.lock:
+            request = self.pending.get(key)
+            if request is None or request.started or request.callbacks:
+                return
+            request.cancelled = True
+            del self.pending[key]
+        self.prefetch_dropped_counter.inc()
+
+    def enqueue(self, key, prompt, fallback, callback, max_tokens, timeout, cache_key=None):
+        with self.lock:
+            request = self.pending.get(key)
+            if request is not None:
+                # 合并重复触发：还没发出就用最新状态，已发出则只等结果
+                if not request.started:
+                    request.prompt = prompt
+                    request.fallback = fallback
+                    request.cache_key = request.cache_key or cache_key
+                if callback is not None and callback not in request.callbacks:
+                    request.callbacks.append(callback)
+                self.coalesced_counter.inc()
+                return
+
+            request = AlertRequest(key, prompt, fallback, max_tokens, timeout, cache_key)
+            if callback is not None:
+                request.callbacks.append(callback)
+            try:
+                self.queue.put_nowait(request)
+            except queue.Full:
+                self.dropped_counter.inc()
+                return
+            self.pending[key] = request
+        self.ensure_started()
+
+    def ensure_started(self):
+        if self.thread is None or not self.thread.is_alive():
+            with self.lock:
+                if self.thread is None or not self.thread.is_alive():
+                    self.stop_event.clear()
+                    self.thread = threading.Thread(target=self.worker_loop, daemon=True)
+                    self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+        self.backend.close()
+
+    def worker_loop(self):
+        while not self.stop_event.is_set():
+            try:
+                request = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            with self.lock:
+                if request.cancelled:
+                    continue
+                request.started = True
+                prompt, fallback, cache_key = request.prompt, request.fallback, request.cache_key
+
+            self.requests_counter.inc()
+            start = time.perf_counter()
+            try:
+                message = self.backend.generate(prompt, request.max_tokens, request.timeout).strip()
+            except Exception as e:
+                self.failures_counter.inc()
+                log.info("alert_error", "❌ 警告文本生成错误: {}", e)
+                message = ""
+            self.latency_histogram.observe(time.perf_counter() - start)
+
+            if message and cache_key is not None and self.cache is not None:
+                self.cache.put(cache_key, message)
+            message = message or fallback
+
+            with self.lock:
+                self.pending.pop(request.key, None)
+                callbacks = list(request.callbacks)
+            for callback in callbacks:
+                try:
+                    callback(message)
+                except Exception as e:
+                    log.info("alert_callback_error", "❌ 警告回调错误: {}", e)
+
+
+class AlertPrefetcher:
+    """
+    每帧用当前指标（FrameResult 或 FatigueStatistics）调用 update()。
+    FrameResult 直接读取流水线已评估的 verdict，其他指标才用 rules 评估；
+    与流水线共用时传入 rules=pipeline.rules。离阈值最近的规则达到阈值的 fraction 时，
+    按“该规则刚好越过阈值”的状态提前生成提醒，越过阈值时 submit 直接命中缓存；
+    指标回落到 fraction 以下或预计状态改变时，丢弃尚未发出的旧预取。
+    提醒只由闭眼时长、打哈欠次数/时长决定，PERCLOS 等其他规则越过阈值时这三项保持当前值。
+    build_prompt(microsleeps, yawns, yawn_duration) 返回对应状态的提示词。
+    """
+
+    PROMPT_METRICS = ('microsleeps', 'yawns', 'yawn_duration')
+
+    def __init__(self, service, key, build_prompt, max_tokens=100, timeout=5,
+                 thresholds=None, fraction=None, rules=None):
+        self.service = service
+        self.key = key
+        self.build_prompt = build_prompt
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+        self.rules = rules or FatigueRules(thresholds)
+        self.fraction = ALERT_CACHE_CONFIG['prefetch_fraction'] if fraction is None else fraction
+        self.pending_key = None
+
+    def update(self, speed, metrics):
+        if self.service.cache is None or self.fraction <= 0:
+            return
+        verdict = getattr(metrics, 'verdict', None) or self.rules.evaluate(metrics)
+        if verdict.rule is None or verdict.ratio > 1:
+            return  # 已越过阈值，由警告本身的 submit 接手
+        if verdict.ratio < self.fraction:
+            self.drop()
+            return
+
+        values = {name: getattr(metrics, name) for name in self.PROMPT_METRICS}
+        metric = next(metric for name, metric, *_ in self.rules.rules if name == verdict.rule)
+        if metric in values:
+            # 规则在取值超过阈值时触发，计数类指标要多1次才越过
+            values[metric] = int(verdict.threshold) + 1 if metric == 'yawns' else verdict.threshold
+        microsleeps, yawns, yawn_duration = (values[name] for name in self.PROMPT_METRICS)
+        signature = status_signature(speed, microsleeps, yawns, yawn_duration)
+        if f"{self.key}|{signature}" == self.pending_key:
+            return
+        self.drop()
+        self.pending_key = self.service.prefetch(
+            self.key, self.build_prompt(microsleeps, yawns, yawn_duration),
+            signature, self.max_tokens, self.timeout
+        )
+
+    def drop(self):
+        if self.pending_key is not None:
+            self.service.cancel(self.pending_key)
+            self.pending_key = None
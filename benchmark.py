@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+分阶段性能基准测试
+
+在 CPU 上把视频样本回放给检测流水线，统计各阶段的 p50/p95/p99 延迟：
+采集解码、颜色转换、FaceMesh、光流跟踪、各个 YOLO 模型、后处理、统计、
+界面显示转换，以及整体吞吐量。没有指定视频时自动生成一段合成样本。
+
+    python benchmark.py                          # 合成样本，对比已保存的基线
+    python benchmark.py --video fixture.mp4 --mode roi
+    python benchmark.py --save-baseline          # 把本次结果保存为新基线
+
+与基线相比 p50/p95 变慢超过 --tolerance（默认10%）的阶段标记为退化，
+此时进程返回码为 1，便于在不同版本间自动比较。
+"""
+import argparse
+import json
+import os
+import platform
+import time
+
+import cv2
+import numpy as np
+
+from detection_pipeline import DetectionPipeline
+from frame_display import DisplayBuffers
+from profiling import StageProfiler
+
+BENCHMARK_DIR = "benchmarks"
+DEFAULT_FIXTURE = os.path.join(BENCHMARK_DIR, "synthetic_fixture.avi")
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, "baseline.json")
+
+
+def make_synthetic_video(path, frames=300, fps=30, size=(640, 480)):
+    """
+    生成合成测试视频：一张轻微晃动的卡通人脸，包含普通眨眼、
+    一段约2秒的长时间闭眼和一次打哈欠。内容固定，结果可重复。
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    width, height = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    rng = np.random.default_rng(0)
+    background = rng.integers(60, 90, (height, width, 3), dtype=np.uint8)
+
+    for i in range(frames):
+        frame = background.copy()
+        cx = width // 2 + int(8 * np.sin(i / 15))
+        cy = height // 2 + int(4 * np.cos(i / 20))
+
+        blinking = i % 90 < 4
+        long_closure = 150 <= i < 210
+        yawning = 230 <= i < 280
+        eye_h = 2 if (blinking or long_closure) else 12
+        mouth_h = 40 if yawning else 8
+
+        cv2.ellipse(frame, (cx, cy), (120, 160), 0, 0, 360, (150, 180, 220), -1)
+        for dx in (-50, 50):
+            cv2.ellipse(frame, (cx + dx, cy - 40), (25, eye_h), 0, 0, 360, (255, 255, 255), -1)
+            if eye_h > 4:
+                cv2.circle(frame, (cx + dx, cy - 40), 8, (40, 30, 20), -1)
+        cv2.ellipse(frame, (cx, cy + 80), (40, mouth_h), 0, 0, 360, (60, 40, 150), -1)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def display_conversion(frame, buffers):
+    """模拟界面显示前的转换：缩放到视频面板大小并转换颜色（与界面相同的缓冲区复用路径）"""
+    return buffers.convert(frame)
+
+
+def run_benchmark(video, mode="full", warmup=10, repeat=1):
+    profiler = StageProfiler()
+    pipeline = DetectionPipeline(mode=mode)
+    try:
+        pipeline.load_models()
+        pipeline.profiler = profiler
+        frames, elapsed = benchmark_frames(pipeline, profiler, video, warmup, repeat)
+    finally:
+        pipeline.close()  # 多进程推理时释放工作进程和共享内存
+
+    return {
+        'video': os.path.basename(video),
+        'mode': mode,
+        'frames': frames,
+        'throughput_fps': round(frames / elapsed, 2) if elapsed > 0 else 0.0,
+        'platform': f"{platform.system()} {platform.machine()} / Python {platform.python_version()}",
+        'stages': profiler.summary(),
+    }
+
+
+def benchmark_frames(pipeline, profiler, video, warmup, repeat):
+    """逐帧处理视频 repeat 遍，返回预热之后的 (帧数, 总耗时秒)"""
+    buffers = DisplayBuffers()
+    buffers.set_panel_size(640, 480)
+
+    frames = seen = 0
+    elapsed = 0.0
+    for _ in range(repeat):
+        cap = cv2.VideoCapture(video)
+        if not cap.isOpened():
+            raise FileNotFoundError(f"无法打开视频: {video}")
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        pipeline.reset()
+        index = 0
+        while True:
+            # 预热帧（模型首次推理、内存分配）不计入统计
+            if seen == warmup:
+                profiler.reset()
+                frames = 0
+                elapsed = 0.0
+
+            start = time.perf_counter()
+            with profiler.stage("capture"):
+                ret, frame = cap.read()
+            if not ret:
+                break
+            with profiler.stage("total"):
+                pipeline.process_frame(frame, index / fps)
+            with profiler.stage("display"):
+                display_conversion(frame, buffers)
+            elapsed += time.perf_counter() - start
+            index += 1
+            seen += 1
+            frames += 1
+        cap.release()
+    return frames, elapsed
+
+
+def compare(report, baseline, tolerance):
+    """与基线对比，返回退化的阶段列表"""
+    regressions = []
+    for name, stats in report['stages'].items():
+        base = baseline.get('stages', {}).get(name)
+        if not base:
+            continue
+        for key in ('p50_ms', 'p95_ms'):
+            if base[key] > 0 and stats[key] > base[key] * (1 + tolerance):
+                regressions.append((name, key, base[key], stats[key]))
+
+    base_fps = baseline.get('throughput_fps', 0)
+    if base_fps and report['throughput_fps'] < base_fps * (1 - tolerance):
+        regressions.append(('throughput', 'fps', base_fps, report['throughput_fps']))
+    return regressions
+
+
+def print_report(report, baseline=None):
+    print(f"\n📊 {report['video']} ({report['mode']}) - {report['frames']} 帧, "
+          f"吞吐量 {report['throughput_fps']} fps")
+    print(f"{'阶段':<18}{'次数':>8}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'基线p50':>10}")
+    base_stages = (baseline or {}).get('stages', {})
+    for name, stats in sorted(report['stages'].items(), key=lambda item: -item[1]['p50_ms']):
+        base = base_stages.get(name, {}).get('p50_ms', '-')
+        print(f"{name:<18}{stats['count']:>8}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}"
+              f"{stats['p99_ms']:>10.2f}{base:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检测流水线分阶段性能基准测试")
+    parser.add_argument("--video", default=None, help="测试视频，默认生成合成样本")
+    parser.add_argument("--mode", choices=("full", "roi"), default="full")
+    parser.add_argument("--warmup", type=int, default=10, help="不计入统计的预热帧数")
+    parser.add_argument("--repeat", type=int, default=1, help="视频重复回放次数")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="基线文件")
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果保存为基线")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="允许的变慢比例")
+    parser.add_argument("--output", default=None, help="把本次结果另存为 JSON")
+    args = parser.parse_args()
+
+    video = args.video
+    if video is None:
+        video = DEFAULT_FIXTURE
+        if not os.path.exists(video):
+            print(f"🎬 生成合成样本: {video}")
+            make_synthetic_video(video)
+
+    report = run_benchmark(video, args.mode, args.warmup, args.repeat)
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 基线已保存: {args.baseline}")
+        return 0
+
+    if baseline is None:
+        print("ℹ️ 没有基线文件，使用 --save-baseline 保存当前结果")
+        return 0
+
+    regressions = compare(report, baseline, args.tolerance)
+    if regressions:
+        print("\n❌ 性能退化：")
+        for name, key, before, after in regressions:
+            print(f"  {name} {key}: {before} → {after}")
+        return 1
+    print("\n✅ 与基线相比没有明显退化")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+逐眼眨眼跟踪
+
+每只眼睛分别识别眨眼片段（第一帧闭眼 → 第一帧睁眼），记录眨眼时长和
+与上一次眨眼的间隔。长时间、缓慢的眨眼是最早出现的疲劳信号，
+但一趟行程的完整历史会无限增长，因此用 QuantileSketch 只保留分布：
+
+- 对数分桶（与 DDSketch 相同），任意分位数的相对误差不超过 relative_accuracy
+- 最多 max_buckets 个连续的桶（内存固定为 max_buckets 个 float64），桶窗口随样本上下移动；
+  只有取值范围真正超过窗口时才与 DDSketch 一样把最低的桶合并，只有最低端的分位数变粗，
+  p50/p90 不受影响。相对误差2%时128个桶可覆盖约166倍的取值范围（如 0.05~8 秒的眨眼时长）
+- 插入 O(1)（窗口移动时 O(max_buckets)），分位数在插入后重新计算并缓存
+- half_life > 0 时旧数据按半衰期衰减，分位数反映最近一段时间而不是整趟行程
+"""
+import math
+
+import numpy as np
+
+from config import BLINK_CONFIG
+
+QUANTILES = (0.5, 0.9)
+EMPTY_WEIGHT = 0.01  # 衰减到不足一个样本1%的桶视为空，窗口下移时可以移出
+
+
+class QuantileSketch:
+    """有界内存的流式分位数估计"""
+
+    def __init__(self, relative_accuracy=0.02, min_value=0.01, max_buckets=128, half_life=0.0):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.counts = np.zeros(max_buckets)
+        self.offset = None  # counts[0] 对应的桶编号，第一个样本到来时确定
+        self.half_life = half_life
+        self.last_timestamp = None
+        self.quantiles = dict.fromkeys(QUANTILES, 0.0)
+
+    def reset(self):
+        self.counts.fill(0.0)
+        self.offset = None
+        self.last_timestamp = None
+        self.quantiles = dict.fromkeys(QUANTILES, 0.0)
+
+    @property
+    def count(self):
+        """（衰减后的）样本权重之和"""
+        return float(self.counts.sum())
+
+    def bucket(self, value):
+        """value 在 counts 中的位置，必要时移动桶窗口"""
+        key = math.ceil(math.log(max(value, self.min_value)) / self.log_gamma)
+        size = len(self.counts)
+        if self.offset is None:
+            self.offset = key - size // 2  # 第一个样本放在中间，两侧都留有余量
+        if key < self.offset:
+            # 低于最低的桶：最高端有空桶时窗口下移，移不下的部分才计入最低桶
+            occupied = np.flatnonzero(self.counts >= EMPTY_WEIGHT)
+            top = occupied[-1] if len(occupied) else -1
+            slide = min(self.offset - key, size - 1 - top)
+            if slide > 0:
+                self.counts[slide:] = self.counts[:size - slide].copy()
+                self.counts[:slide] = 0.0
+                self.offset -= slide
+        shift = key - (self.offset + size - 1)
+        if shift > 0:
+            # 超出最高的桶：窗口上移，移出的最低几个桶合并到新的最低桶
+            if shift < size:
+                collapsed = self.counts[:shift + 1].sum()
+                self.counts[:size - shift] = self.counts[shift:].copy()
+                self.counts[size - shift:] = 0.0
+            else:
+                collapsed = self.counts.sum()
+                self.counts.fill(0.0)
+            self.counts[0] = collapsed
+            self.offset += shift
+        return max(key - self.offset, 0)  # 范围超出窗口时计入最低桶
+
+    def value(self, index):
+        """桶 (γ^(i-1), γ^i] 的代表值，与区间两端的相对误差相同"""
+        return 2 * self.gamma ** (index + self.offset) / (self.gamma + 1)
+
+    def add(self, value, timestamp=None):
+        if self.half_life > 0 and timestamp is not None:
+            if self.last_timestamp is not None and timestamp > self.last_timestamp:
+                self.counts *= 0.5 ** ((timestamp - self.last_timestamp) / self.half_life)
+            self.last_timestamp = timestamp
+        self.counts[self.bucket(value)] += 1.0
+        self.quantiles = {q: self.quantile(q) for q in QUANTILES}
+
+    def quantile(self, q):
+        cumulative = np.cumsum(self.counts)
+        total = cumulative[-1]
+        if total <= 0:
+            return 0.0
+        index = int(np.searchsorted(cumulative, q * total))
+        return self.value(min(index, len(self.counts) - 1))
+
+    @property
+    def p50(self):
+        return self.quantiles[0.5]
+
+    @property
+    def p90(self):
+        return self.quantiles[0.9]
+
+
+def create_sketch(config):
+    return QuantileSketch(config['relative_accuracy'], config['min_value'],
+                          config['max_buckets'], config['half_life'])
+
+
+class EyeBlinks:
+    """单只眼睛的眨眼片段、时长和间隔分布"""
+
+    def __init__(self, config=None):
+        cfg = config or BLINK_CONFIG
+        self.max_duration = cfg['max_blink_duration']
+        self.durations = create_sketch(cfg)
+        self.intervals = create_sketch(cfg)
+        self.reset()
+
+    def reset(self):
+        self.durations.reset()
+        self.intervals.reset()
+        self.closure_start = None
+        self.last_blink_start = None
+        self.blinks = 0
+
+    def interrupt(self):
+        """人脸丢失：丢弃进行中的片段，下一次眨眼不计算间隔"""
+        self.closure_start = None
+        self.last_blink_start = None
+
+    def update(self, closed, timestamp):
+        """closed 为 None 表示本帧未检测到这只眼睛，不改变当前片段"""
+        if closed is None:
+            return
+        if closed:
+            if self.closure_start is None:
+                self.closure_start = timestamp
+            return
+        if self.closure_start is None:
+            return
+
+        start, self.closure_start = self.closure_start, None
+        duration = timestamp - start
+        if duration > self.max_duration:
+            # 更长的闭眼算作微睡眠，不计入眨眼分布，也不作为下一次间隔的起点
+            self.last_blink_start = None
+            return
+        self.blinks += 1
+        self.durations.add(duration, timestamp)
+        if self.last_blink_start is not None:
+            self.intervals.add(start - self.last_blink_start, timestamp)
+        self.last_blink_start = start
+
+
+class BlinkTracker:
+    def __init__(self, config=None):
+        self.left = EyeBlinks(config)
+        self.right = EyeBlinks(config)
+
+    def reset(self):
+        self.left.reset()
+        self.right.reset()
+
+    def skip(self):
+        self.left.interrupt()
+        self.right.interrupt()
+
+    def update(self, left_closed, right_closed, timestamp):
+        self.left.update(left_closed, timestamp)
+        self.right.update(right_closed, timestamp)
@@ -18,9 +18,112 @@ DROWSINESS_THRESHOLDS = {
     "microsleep_threshold": 3.5,  # 闭眼超过3.5秒视为疲劳（从3秒降低）
     "yawn_duration_threshold": 8.0,  # 哈欠持续超过8秒视为疲劳（从7秒降低）
     "yawn_count_threshold": 4,  # 连续打哈欠超过4次视为疲劳（从3次降低）
+    "perclos_threshold": 0.15,  # 长窗口内闭眼时间占比超过15%视为疲劳
     "alert_cooldown": 60  # 提醒间隔时间（秒）（从30秒降低）
 }
 
+# 疲劳规则：名称 → (FatigueStatistics 的指标, DROWSINESS_THRESHOLDS 中的阈值键)
+# 指标超过阈值为“危险”，超过 warning_levels 中的值为“警告”；所有界面和警告预取都使用这一份规则
+FATIGUE_RULES_CONFIG = {
+    "rules": {
+        "microsleep": ("microsleeps", "microsleep_threshold"),
+        "yawn_duration": ("yawn_duration", "yawn_duration_threshold"),
+        "yawn_count": ("yawns", "yawn_count_threshold"),
+        "perclos": ("perclos", "perclos_threshold"),
+    },
+    # 状态面板的“警告”条件（与原界面相同：闭眼超过1秒或打哈欠超过1次），未列出的规则没有警告等级
+    "warning_levels": {"microsleep": 1.0, "yawn_count": 1}
+}
+
+# 滑动窗口疲劳指标配置（PERCLOS、眨眼频率、打哈欠频率）
+ANALYTICS_CONFIG = {
+    "bucket_seconds": 1.0,  # 环形缓冲区每桶的时长（秒），即窗口的时间分辨率
+    "short_window": 60,  # 短窗口（秒）：PERCLOS、眨眼频率和平均眨眼时长
+    "long_window": 300,  # 长窗口（秒）：PERCLOS（参与疲劳判定）、打哈欠频率
+    "min_observed": 30  # 窗口内有效观测不足该时长（秒）时不用于疲劳判定
+}
+
+# 逐眼眨眼分布配置（眨眼时长和眨眼间隔的流式分位数）
+BLINK_CONFIG = {
+    "max_blink_duration": 2.0,  # 更长的闭眼视为微睡眠，不计入眨眼分布（秒）
+    "relative_accuracy": 0.02,  # 分位数的相对误差
+    "min_value": 0.01,  # 更小的取值（秒）按该值计
+    "max_buckets": 128,  # 每个分布最多的桶数（内存上限），范围超出时合并最低的桶
+    "half_life": 900  # 旧眨眼的权重每15分钟减半，0 表示统计整趟行程
+}
+
+# 模型文件配置
+MODEL_CONFIG = {
+    "eye_model": "runs/detecteye/train/weights/best.pt",
+    "yawn_model": "runs/detectyawn/train/weights/best.pt",
+    # 4类统一模型（眼睛+打哈欠），设置后替代上面两个模型，例如
+    # "runs/detectunified/train/weights/best.pt"（见 train.ipynb）
+    "unified_model": None,
+    "unified_classes": {"open_eye": 0, "close_eye": 1, "yawn": 2, "no_yawn": 3}
+}
+
+# 推理后端配置
+INFERENCE_CONFIG = {
+    "backend": "ultralytics",  # ultralytics / onnxruntime / openvino
+    "int8": False,  # onnxruntime/openvino 使用 INT8 量化模型
+    "calibration_dir": "datasets/images/val",  # INT8 量化校准图片
+    "imgsz": 640,
+    "num_threads": 0,  # 0 表示由运行时自动决定；多进程推理时为每个进程的线程数
+    "workers": 0  # >0 时在多个子进程中推理（每个模型各一组进程），避免与界面/采集线程争用 GIL
+}
+
+# 推理调度配置（单位：帧）
+SCHEDULER_CONFIG = {
+    "enabled": True,
+    "eye_interval": 1,  # 眼睛每帧检测，保证眨眼分辨率
+    "yawn_interval": 4,  # 打哈欠每4帧检测一次，中间帧沿用上一状态
+    "boost_interval": 1,  # 状态变化后临时提高到每帧检测
+    "boost_frames": 15  # 加速持续的帧数
+}
+
+# ROI模式关键点跟踪配置
+TRACKER_CONFIG = {
+    "enabled": True,
+    "landmark_interval": 10,  # 每10帧运行一次完整的 FaceMesh，中间帧用光流跟踪
+    "max_motion": 20,  # 单帧位移超过20像素时下一帧重新定位
+    "fb_error": 2.0,  # 前后向光流误差上限（像素）
+    "min_points": 5  # 7个点中可靠跟踪的点少于5个视为丢失
+}
+
+# 关键点几何判定配置（ROI模式）：EAR/MAR 明显时直接判定，模糊区间才运行 YOLO
+# 只在运行 FaceMesh 的帧上判定（光流跟踪的帧照常用 YOLO）；阈值尚未用实际视频校准，默认关闭
+GEOMETRY_CONFIG = {
+    "enabled": False,
+    "ear_closed": 0.18,  # 眼睛纵横比低于该值直接判定为闭眼
+    "ear_open": 0.25,  # 高于该值直接判定为睁眼，两者之间交给眼睛模型
+    "mar_yawn": 0.6,  # 嘴部纵横比高于该值直接判定为打哈欠
+    "mar_normal": 0.35  # 低于该值直接判定为正常，两者之间交给打哈欠模型
+}
+
+# 分阶段并行执行配置（定位 → 推理 → 统计 → 发布 各自一个线程）
+STAGED_CONFIG = {
+    "enabled": True,
+    "queue_size": 2,  # 阶段之间的队列长度
+    # 队列满时的策略：block 等待下游 / drop_oldest 丢弃最旧的 / drop_newest 丢弃新来的
+    "infer_policy": "drop_oldest",  # 推理跟不上时丢弃过时的帧
+    "finish_policy": "block",  # 已推理的结果都要计入统计
+    "publish_policy": "drop_oldest"  # 界面绘制跟不上时只显示最新结果
+}
+
+# 指标与日志配置
+METRICS_CONFIG = {
+    "log_interval": 1.0,  # 同一类日志每秒最多输出一条
+    "log_queue_size": 1000  # 日志队列满时丢弃，不阻塞检测线程
+}
+
+# 会话日志配置（只记录状态变化和警告的二进制日志）
+SESSION_LOG_CONFIG = {
+    "enabled": True,
+    "directory": "sessions",  # 每次检测一个文件：<名称>_<开始时间>.dlog
+    "buffer_size": 256,  # 缓冲的记录数，写满后写盘
+    "flush_interval": 5.0  # 距上次写盘超过该时间（秒）时写盘
+}
+
 # 界面显示配置
 UI_CONFIG = {
     "window_title": "驾驶状态监测系统",
@@ -35,4 +138,28 @@ ALERT_CONFIG = {
     "box_cooldown": 15,  # 提示框显示间隔（秒）
     "sound_frequency": 1000,  # 警告音频率
     "sound_duration": 500  # 警告音持续时间（毫秒）
+}
+
+# 警告文本生成后端配置
+ALERT_BACKEND_CONFIG = {
+    "backend": "http",  # http（DeepSeek接口）/ template（离线模板）/ mock（本地模拟服务器）
+    "pool_size": 4,  # HTTP 长连接池大小
+    "mock_host": "127.0.0.1",
+    "mock_port": 8765,
+    "mock_latency": 0.0  # 模拟服务器每次响应前的延迟（秒），用于压测
+}
+
+# 警告文本缓存配置（按量化后的驾驶状态缓存 DeepSeek 生成的提醒）
+ALERT_CACHE_CONFIG = {
+    "enabled": True,
+    "path": "alert_cache.json",  # 持久化文件，设为 None 则只缓存在内存
+    "ttl": 7 * 24 * 3600,  # 条目过期时间（秒）
+    "refresh_after": 600,  # 条目超过该时间后在后台重新生成（秒）
+    "max_entries": 256,  # 超出后淘汰最久未使用的状态
+    "max_variants": 3,  # 每个状态保留的不同提醒数，轮流使用
+    "speed_step": 20,  # 车速分桶（km/h）
+    "microsleep_step": 1.0,  # 闭眼时长分桶（秒）
+    "yawn_duration_step": 2.0,  # 哈欠时长分桶（秒）
+    "max_yawn_count": 8,  # 打哈欠次数超过该值归为同一桶
+    "prefetch_fraction": 0.7  # 任一疲劳指标达到阈值的该比例时提前生成警告，0 表示不预取
 } 
\ No newline at end of file
@@ -0,0 +1,926 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+无界面检测流水线
+
+采集 → 人脸关键点/ROI → 眼睛/打哈欠推理 → 统计 → 警告判定
+本模块不导入任何 GUI 库，Tk/Qt 前端通过 subscribe() 订阅每一帧的结果，
+也可以在没有显示器的情况下直接运行和测速：
+
+    python detection_pipeline.py
+"""
+import threading
+import time
+from concurrent.futures import Future
+
+import cv2
+import numpy as np
+
+from blink_tracker import BlinkTracker
+from config import DROWSINESS_THRESHOLDS, GEOMETRY_CONFIG, MODEL_CONFIG
+from fatigue_analytics import LONG, FatigueAnalytics
+from fatigue_rules import NORMAL_VERDICT, FatigueRules
+from frame_state import EYE_CLOSED, MICROSLEEP_WEIGHTS, YAWNING, State, state_name
+from inference_backend import load_backend
+from frame_capture import FrameCapture
+from inference_scheduler import InferenceScheduler
+from landmark_geometry import LandmarkGeometry
+from metrics import REGISTRY, MetricsProfiler, log
+from roi_tracker import RoiTracker
+
+MICROSLEEP_DECAY = 1 / 3  # 睁眼时闭眼时长的回落速度
+YAWN_DECAY = 0.4  # 未打哈欠时哈欠时长的回落速度
+
+# 两帧间隔的上限（秒），避免卡顿或暂停后一次累积过多
+MAX_FRAME_INTERVAL = 0.5
+
+# 各解码函数期望的类别编号，统一模型的输出会先映射到这些编号
+EYE_FULL_CLASSES = {"close_eye": 0, "open_eye": 1}
+EYE_ROI_CLASSES = {"open_eye": 0, "close_eye": 1}
+YAWN_CLASSES = {"yawn": 0, "no_yawn": 1}
+
+
+def open_camera(indices=range(3), width=None, height=None, fps=None):
+    """依次尝试摄像头索引，返回第一个可用的 VideoCapture，全部失败返回 None"""
+    for i in indices:
+        print(f"📷 尝试打开摄像头 {i}...")
+        cap = cv2.VideoCapture(i)
+        if cap.isOpened():
+            if width:
+                cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            if height:
+                cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+            if fps:
+                cap.set(cv2.CAP_PROP_FPS, fps)
+            print(f"✅ 摄像头 {i} 初始化成功")
+            return cap
+        cap.release()
+    print("❌ 未找到可用摄像头")
+    return None
+
+
+def crop_rois(frame, points):
+    """根据7个关键点裁剪嘴部、右眼、左眼区域（坐标限制在画面内）"""
+    ih, iw = frame.shape[:2]
+    points = [(min(max(x, 0), iw), min(max(y, 0), ih)) for x, y in points]
+
+    x1, y1 = points[0]
+    x2, _ = points[1]
+    _, y3 = points[2]
+    x4, y4 = points[3]
+    x5, y5 = points[4]
+    x6, y6 = points[5]
+    x7, y7 = points[6]
+    x6, x7 = min(x6, x7), max(x6, x7)
+    y6, y7 = min(y6, y7), max(y6, y7)
+
+    return {
+        'mouth': frame[y1:y3, x1:x2],
+        'right_eye': frame[y4:y5, x4:x5],
+        'left_eye': frame[y6:y7, x6:x7],
+    }
+
+
+def remap_detections(detection, class_map):
+    """只保留 class_map 中的类别，并把类别编号换成映射后的值"""
+    xyxy, confidences, class_ids = detection
+    keep = np.isin(class_ids, list(class_map))
+    mapped = np.array([class_map[int(c)] for c in class_ids[keep]], dtype=np.int64)
+    return xyxy[keep], confidences[keep], mapped
+
+
+# 两个眼睛检测框的 IoU 低于该值才视为两只不同的眼睛
+EYE_BOX_IOU = 0.3
+
+
+def box_iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def decode_eyes_full(xyxy, confidences, class_ids):
+    """
+    整帧眼睛模型按检测框分别解码两只眼睛，返回 (左眼状态, 右眼状态)。
+    取置信度最高的框，再取与它不重叠的最高框作为另一只眼；
+    画面左侧的是人的右眼（与 crop_rois 一致，摄像头画面未镜像）。
+    只检测到一只眼时两只眼使用同一结果。
+    """
+    if len(confidences) == 0:
+        return State.UNKNOWN, State.UNKNOWN
+    order = np.argsort(confidences)[::-1]
+    first = order[0]
+    second = next((i for i in order[1:] if box_iou(xyxy[first], xyxy[i]) < EYE_BOX_IOU), None)
+    first_state = eye_state_full(int(class_ids[first]), confidences[first])
+    if second is None:
+        return first_state, first_state
+    second_state = eye_state_full(int(class_ids[second]), confidences[second])
+    if xyxy[first][0] + xyxy[first][2] < xyxy[second][0] + xyxy[second][2]:
+        return second_state, first_state
+    return first_state, second_state
+
+
+def eye_state_full(class_id, confidence):
+    """整帧眼睛模型：class=0 是闭眼，class=1 是睁眼"""
+    if class_id == 0:
+        if confidence > 0.2:
+            return State.CLOSED
+        if confidence > 0.1:
+            return State.LIKELY_CLOSED
+        # 即使置信度很低，如果检测到class=0，也认为是倾向闭眼
+        return State.MAYBE_CLOSED
+    if confidence > 0.2:
+        return State.OPEN
+    if confidence > 0.1:
+        return State.LIKELY_OPEN
+    return State.MAYBE_OPEN
+
+
+def decode_yawn_full(confidences, class_ids, previous):
+    """整帧打哈欠模型：class=0 是打哈欠，class=1 是正常；低置信度时保持上一状态"""
+    if len(confidences) == 0:
+        return State.UNKNOWN
+    index = np.argmax(confidences)
+    class_id = int(class_ids[index])
+    confidence = confidences[index]
+    if class_id == 0 and confidence > 0.3:
+        return State.YAWN
+    if class_id == 1 and confidence > 0.3:
+        return State.NO_YAWN
+    if confidence > 0.2:
+        return State.LIKELY_YAWN if class_id == 0 else State.NO_YAWN
+    return previous
+
+
+def decode_eye_roi(confidences, class_ids, previous):
+    """眼部ROI模型：class=1 是闭眼，class=0 是睁眼；无结果时保持上一状态"""
+    if len(confidences) == 0:
+        return previous
+    index = np.argmax(confidences)
+    class_id = int(class_ids[index])
+    if class_id == 1:
+        return State.CLOSED
+    if class_id == 0 and confidences[index] > 0.30:
+        return State.OPEN
+    return previous
+
+
+def decode_yawn_roi(confidences, class_ids, previous):
+    """嘴部ROI模型：class=0 是打哈欠，class=1 是正常；无结果时保持上一状态"""
+    if len(confidences) == 0:
+        return previous
+    index = np.argmax(confidences)
+    class_id = int(class_ids[index])
+    if class_id == 0:
+        return State.YAWN
+    if class_id == 1 and confidences[index] > 0.50:
+        return State.NO_YAWN
+    return previous
+
+
+def eye_closed(state):
+    """单只眼睛是否闭眼，未检测时返回 None"""
+    return None if state == State.UNKNOWN else EYE_CLOSED[state]
+
+
+class FatigueStatistics:
+    """
+    疲劳统计：眨眼次数、闭眼时长、打哈欠次数和持续时间
+
+    时长按帧的采集时间戳累积，与帧率无关：跳帧、批处理或调度降频后
+    阈值仍然表示真实的秒数。analytics 另外给出最近1/5分钟的 PERCLOS、
+    眨眼频率等滑动窗口指标，blink_tracker 给出每只眼睛的眨眼时长/间隔分位数。
+
+    decay=True 时睁眼/哈欠结束后闭眼时长和哈欠时长逐渐回落；
+    decay=False 时立即清零，即“当前这次连续闭眼/打哈欠的时长”（Qt 版界面的语义）。
+    """
+
+    def __init__(self, decay=True):
+        self.decay = decay
+        self.analytics = FatigueAnalytics()
+        self.blink_tracker = BlinkTracker()
+        self.reset()
+
+    def reset(self):
+        """重置所有统计数据"""
+        self.blinks = 0
+        self.microsleeps = 0.0
+        self.yawns = 0
+        self.yawn_duration = 0.0
+        self.eyes_still_closed = False
+        self.yawn_in_progress = False
+        self.last_timestamp = None
+        self.analytics.reset()
+        self.blink_tracker.reset()
+
+    def elapsed(self, timestamp):
+        """距上一帧经过的秒数（首帧为0，并限制在 MAX_FRAME_INTERVAL 内）"""
+        dt = 0.0 if self.last_timestamp is None else timestamp - self.last_timestamp
+        self.last_timestamp = timestamp
+        return min(max(dt, 0.0), MAX_FRAME_INTERVAL)
+
+    def skip(self, timestamp):
+        """未检测到人脸的帧：只推进时间，不累积"""
+        self.last_timestamp = timestamp
+        self.analytics.skip(timestamp)
+        self.blink_tracker.skip()
+
+    def update(self, left_eye_state, right_eye_state, yawn_state, timestamp):
+        """根据本帧的眼睛/嘴部状态和采集时间戳更新统计"""
+        dt = self.elapsed(timestamp)
+
+        eyes_closed = EYE_CLOSED[left_eye_state] and EYE_CLOSED[right_eye_state]
+        yawning = YAWNING[yawn_state]
+        self.analytics.update(timestamp, dt, eyes_closed, yawning)
+        self.blink_tracker.update(eye_closed(left_eye_state), eye_closed(right_eye_state), timestamp)
+
+        # 眨眼和闭眼检测 - 根据闭眼状态的确定性，调整累积速度
+        if eyes_closed:
+            if not self.eyes_still_closed:
+                self.eyes_still_closed = True
+                self.blinks += 1
+            self.microsleeps += dt * MICROSLEEP_WEIGHTS[left_eye_state]
+        else:
+            self.eyes_still_closed = False
+            if not self.decay:
+                self.microsleeps = 0.0
+            # 逐渐减少闭眼时间
+            elif self.microsleeps > 0:
+                self.microsleeps = max(0, self.microsleeps - dt * MICROSLEEP_DECAY)
+
+        # 打哈欠检测
+        if yawning:
+            if not self.yawn_in_progress:
+                self.yawn_in_progress = True
+                self.yawns += 1
+            self.yawn_duration += dt
+        else:
+            self.yawn_in_progress = False
+            if not self.decay:
+                self.yawn_duration = 0.0
+            elif self.yawn_duration > 0:
+                self.yawn_duration = max(0, self.yawn_duration - dt * YAWN_DECAY)
+
+    @property
+    def perclos(self):
+        """参与疲劳判定的长窗口 PERCLOS，有效观测时间不足时为0"""
+        return self.analytics.perclos_long if self.analytics.ready(LONG) else 0.0
+
+
+class FrameResult:
+    """单帧检测结果，由流水线发布给所有订阅者；眼睛/嘴部状态为 frame_state.State 编号"""
+
+    __slots__ = ('frame_index', 'timestamp', 'face_found', 'left_eye_state', 'right_eye_state',
+                 'yawn_state', 'blinks', 'microsleeps', 'yawns', 'yawn_duration', 'is_drowsy',
+                 'verdict', 'alert_triggered', 'landmarks_refreshed', 'eye_inferred', 'yawn_inferred',
+                 'detection_time', 'perclos', 'perclos_short', 'perclos_long', 'blink_rate', 'mean_blink_duration',
+                 'yawn_rate', 'left_blink_p50', 'left_blink_p90', 'right_blink_p50', 'right_blink_p90',
+                 'left_interval_p50', 'left_interval_p90', 'right_interval_p50', 'right_interval_p90')
+
+    # 导出（JSONL/CSV/FRAME_DTYPE）时的字段顺序
+    FIELDS = ('frame_index', 'timestamp', 'face_found', 'left_eye_state', 'right_eye_state',
+              'yawn_state', 'blinks', 'microsleeps', 'yawns', 'yawn_duration', 'is_drowsy',
+              'alert_triggered', 'landmarks_refreshed', 'eye_inferred', 'yawn_inferred',
+              'detection_time', 'perclos_short', 'perclos_long', 'blink_rate',
+              'mean_blink_duration', 'yawn_rate', 'left_blink_p50', 'left_blink_p90',
+              'right_blink_p50', 'right_blink_p90', 'left_interval_p50', 'left_interval_p90',
+              'right_interval_p50', 'right_interval_p90', 'fatigue_level', 'fatigue_rule',
+              'fatigue_margin')
+
+    def __init__(self, frame_index, timestamp):
+        self.frame_index = frame_index
+        self.timestamp = timestamp
+        self.face_found = False
+        self.left_eye_state = State.UNKNOWN
+        self.right_eye_state = State.UNKNOWN
+        self.yawn_state = State.UNKNOWN
+        self.blinks = 0
+        self.microsleeps = 0.0
+        self.yawns = 0
+        self.yawn_duration = 0.0
+        self.is_drowsy = False
+        self.verdict = NORMAL_VERDICT  # 疲劳规则的判定，见 fatigue_rules
+        self.alert_triggered = False  # 本帧需要发出警告（已考虑冷却时间）
+        self.landmarks_refreshed = False  # ROI模式：本帧运行了 FaceMesh（否则为光流跟踪）
+        self.eye_inferred = False  # 本帧是否运行了眼睛/打哈欠推理（否则沿用上一状态）
+        self.yawn_inferred = False
+        self.detection_time = 0.0
+        # 滑动窗口指标，见 fatigue_analytics
+        self.perclos = 0.0  # 参与疲劳判定的 PERCLOS（FatigueStatistics.perclos，观测不足时为0）
+        self.perclos_short = 0.0  # 短窗口（1分钟）闭眼时间占比
+        self.perclos_long = 0.0  # 长窗口（5分钟）闭眼时间占比
+        self.blink_rate = 0.0  # 次/分钟
+        self.mean_blink_duration = 0.0  # 秒
+        self.yawn_rate = 0.0  # 次/分钟
+        # 每只眼睛的眨眼时长和眨眼间隔分位数（秒），见 blink_tracker
+        self.left_blink_p50 = self.left_blink_p90 = 0.0
+        self.right_blink_p50 = self.right_blink_p90 = 0.0
+        self.left_interval_p50 = self.left_interval_p90 = 0.0
+        self.right_interval_p50 = self.right_interval_p90 = 0.0
+
+    @property
+    def fatigue_level(self):
+        return self.verdict.level
+
+    @property
+    def fatigue_rule(self):
+        return self.verdict.rule or ""
+
+    @property
+    def fatigue_margin(self):
+        return self.verdict.margin
+
+    STATE_FIELDS = ('left_eye_state', 'right_eye_state', 'yawn_state')
+
+    def as_dict(self):
+        """导出为字典，状态转为显示文字"""
+        record = {field: getattr(self, field) for field in self.FIELDS}
+        for field in self.STATE_FIELDS:
+            record[field] = state_name(record[field])
+        return record
+
+    def as_tuple(self):
+        """按 FIELDS 顺序的原始取值（状态为编号），对应 FRAME_DTYPE 的一行"""
+        return tuple(getattr(self, field) for field in self.FIELDS)
+
+
+# 批量保存和回放用的结构化类型，字段与 FrameResult.FIELDS 一一对应，未列出的为 float32
+FRAME_FIELD_TYPES = {
+    'frame_index': '<u4', 'timestamp': '<f8', 'face_found': '?',
+    'left_eye_state': 'u1', 'right_eye_state': 'u1', 'yawn_state': 'u1',
+    'blinks': '<u4', 'yawns': '<u4', 'is_drowsy': '?', 'alert_triggered': '?',
+    'landmarks_refreshed': '?', 'eye_inferred': '?', 'yawn_inferred': '?',
+    'fatigue_level': 'u1', 'fatigue_rule': 'S16',
+}
+FRAME_DTYPE = np.dtype([(field, FRAME_FIELD_TYPES.get(field, '<f4')) for field in FrameResult.FIELDS])
+
+
+def results_to_array(results):
+    """把一批 FrameResult 转为 FRAME_DTYPE 数组，np.save 后可用 mmap_mode='r' 直接回放"""
+    return np.array([result.as_tuple() for result in results], dtype=FRAME_DTYPE)
+
+
+class FrameJob:
+    """一帧在 begin_frame 和 end_frame 之间的中间状态"""
+
+    def __init__(self, result, start_time, generation=0):
+        self.result = result
+        self.start_time = start_time
+        self.generation = generation  # 生成时流水线的重置代数，重置前的帧不再反馈给调度器
+        self.run_eye = False
+        self.run_yawn = False
+        self.requests = []  # [(模型, 置信度阈值, key, 图像)]
+        self.pending = []  # submit 返回的未完成推理
+        self.geometry_states = {}  # ROI模式：由关键点几何直接判定的状态 {ROI key: 状态}
+
+
+class DetectionPipeline:
+    """
+    检测引擎
+
+    mode="full": 眼睛和打哈欠模型直接在整帧上推理（现代版界面使用）
+    mode="roi":  先用 MediaPipe FaceMesh 定位眼睛/嘴部，再对裁剪区域推理；
+                 开启 GEOMETRY_CONFIG 时先用 EAR/MAR 判定，只有模糊的区域才推理
+    decay:       传给 FatigueStatistics，见其说明
+    """
+
+    # FaceMesh 中用于裁剪嘴部、右眼、左眼的关键点
+    POINTS_IDS = [187, 411, 152, 68, 174, 399, 298]
+
+    def __init__(self, mode="full", thresholds=None, debug_mode=False, name="pipeline", decay=True):
+        if mode not in ("full", "roi"):
+            raise ValueError(f"未知的检测模式: {mode}")
+        self.mode = mode
+        self.name = name
+        self.thresholds = thresholds or DROWSINESS_THRESHOLDS
+        self.alert_cooldown = self.thresholds['alert_cooldown']
+        self.debug_mode = debug_mode
+        self.conf = 0.15  # 整帧模式的推理置信度阈值
+        self.roi_conf = 0.25  # ROI模式的推理置信度阈值（模型默认值）
+
+        self.detecteye = None
+        self.detectyawn = None
+        self.unified = False
+        self.model_loaded = False
+        self.owns_models = False  # 模型由本流水线加载（而不是与其他流水线共用），close 时释放
+
+        # 统一模型类别 → 解码函数类别
+        classes = MODEL_CONFIG['unified_classes']
+        eye_classes = EYE_ROI_CLASSES if mode == "roi" else EYE_FULL_CLASSES
+        self.eye_class_map = {classes[name]: target for name, target in eye_classes.items()}
+        self.yawn_class_map = {classes[name]: target for name, target in YAWN_CLASSES.items()}
+        self.face_mesh = None
+        self.geometry = LandmarkGeometry() if mode == "roi" and GEOMETRY_CONFIG['enabled'] else None
+
+        self.stats = FatigueStatistics(decay)
+        self.rules = FatigueRules(self.thresholds)
+        self.scheduler = InferenceScheduler()
+        self.tracker = RoiTracker()
+        # 各阶段耗时记入指标直方图；基准测试时替换为 profiling.StageProfiler
+        self.profiler = MetricsProfiler(REGISTRY, prefix=f"{name}.stage")
+        self.frames_counter = REGISTRY.counter(f"{name}.frames")
+        self.faces_lost_counter = REGISTRY.counter(f"{name}.faces_lost")
+        self.landmarks_counter = REGISTRY.counter(f"{name}.landmark_refreshes")
+        self.geometry_decided_counter = REGISTRY.counter(f"{name}.geometry_decided")
+        self.geometry_fallback_counter = REGISTRY.counter(f"{name}.geometry_fallback")
+        self.alerts_counter = REGISTRY.counter(f"{name}.alerts")
+        self.latency_histogram = REGISTRY.histogram(f"{name}.frame_latency")
+        self.capture_latency_histogram = REGISTRY.histogram(f"{name}.capture_to_result")
+        self.microsleeps_gauge = REGISTRY.gauge(f"{name}.microsleeps")
+        self.yawn_duration_gauge = REGISTRY.gauge(f"{name}.yawn_duration")
+        self.perclos_gauge = REGISTRY.gauge(f"{name}.perclos")
+        self.blink_p90_gauge = REGISTRY.gauge(f"{name}.blink_p90")
+        self.subscribers = []
+        # 分阶段执行时 begin_frame 与 end_frame 在不同线程：调度器和跟踪器的读写各自加锁
+        self.scheduler_lock = threading.Lock()
+        self.tracker_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.capture = None
+        self.generation = 0
+        self.reset()
+
+    def reset(self):
+        """重置状态和统计"""
+        self.stats.reset()
+        with self.scheduler_lock:
+            self.scheduler.reset()
+            self.generation += 1
+        with self.tracker_lock:
+            self.tracker.reset()
+        self.left_eye_state = State.UNKNOWN
+        self.right_eye_state = State.UNKNOWN
+        self.yawn_state = State.UNKNOWN
+        self.frame_index = 0
+        self.last_alert_time = None
+        self.latest_result = None
+
+    def load_models(self, shared=None):
+        """
+        加载YOLO模型，失败时抛出异常由调用方处理。
+        传入已加载模型的流水线 shared 时直接共用其模型（多路视频只加载一份权重），
+        FaceMesh 带有跟踪状态，每个流水线仍各自创建。
+        """
+        if shared is not None:
+            self.detecteye = shared.detecteye
+            self.detectyawn = shared.detectyawn
+            self.unified = shared.unified
+            self.owns_models = False
+        else:
+            self.load_yolo_models()
+            self.owns_models = True
+        if self.mode == "roi" and self.face_mesh is None:
+            import mediapipe as mp
+            self.face_mesh = mp.solutions.face_mesh.FaceMesh(
+                min_detection_confidence=0.5, min_tracking_confidence=0.5)
+        self.model_loaded = True
+
+    def load_yolo_models(self):
+        print("🔄 正在加载AI模型...")
+        if MODEL_CONFIG.get('unified_model'):
+            # 一个模型同时输出眼睛和打哈欠类别，每帧只需一次推理
+            self.detecteye = self.detectyawn = load_backend(MODEL_CONFIG['unified_model'])
+            self.unified = True
+        else:
+            self.detectyawn = load_backend(MODEL_CONFIG['yawn_model'])
+            self.detecteye = load_backend(MODEL_CONFIG['eye_model'])
+            self.unified = False
+        print("✅ AI模型加载成功！")
+
+    def subscribe(self, callback):
+        """订阅每帧结果，callback(frame, result) 在处理线程中调用"""
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    def publish(self, frame, result):
+        for callback in list(self.subscribers):
+            try:
+                callback(frame, result)
+            except Exception as e:
+                log.info("subscriber_error", "❌ 订阅者处理错误: {}", e)
+
+    def detect_landmarks(self, frame):
+        """
+        用 FaceMesh 定位7个关键点，返回 (关键点, 几何判定用的关键点)；
+        未开启几何判定时后者为 None，未检测到人脸时两者都为 None
+        """
+        with self.profiler.stage("color_conversion"):
+            image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        with self.profiler.stage("facemesh"):
+            results = self.face_mesh.process(image_rgb)
+        if not results.multi_face_landmarks:
+            return None, None
+
+        face_landmarks = results.multi_face_landmarks[0]
+        ih, iw, _ = frame.shape
+        points = []
+        for point_id in self.POINTS_IDS:
+            lm = face_landmarks.landmark[point_id]
+            points.append((int(lm.x * iw), int(lm.y * ih)))
+        geometry_points = None
+        if self.geometry is not None:
+            geometry_points = self.geometry.points(face_landmarks, iw, ih)
+        return points, geometry_points
+
+    def locate_points(self, frame):
+        """
+        返回 (关键点, 是否运行了FaceMesh, 几何判定用的关键点)。
+        跟踪开启时每隔N帧或跟踪丢失才运行 FaceMesh，其余帧用光流传播关键点；
+        几何判定只在运行了 FaceMesh 的帧上进行（光流只跟踪7个裁剪点，跟踪不到眼睑的开合），
+        其余帧的几何关键点为 None，照常交给 YOLO。
+        """
+        gray = None
+        if self.tracker.enabled:
+            with self.profiler.stage("color_conversion"):
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if not self.tracker.needs_landmarks():
+            with self.profiler.stage("tracking"):
+                points = self.tracker.track(gray)
+            if points is not None:
+                return points, False, None
+
+        points, geometry_points = self.detect_landmarks(frame)
+        if points is None:
+            self.tracker.reset()
+        elif gray is not None:
+            self.tracker.update_landmarks(gray, points)
+        return points, True, geometry_points
+
+    def model_stage(self, model):
+        """计时用的阶段名称"""
+        if self.unified:
+            return "unified_model"
+        return "eye_model" if model is self.detecteye else "yawn_model"
+
+    def eye_detections(self, detection):
+        """统一模型时只取眼睛类别并映射编号"""
+        return remap_detections(detection, self.eye_class_map) if self.unified else detection
+
+    def yawn_detections(self, detection):
+        """统一模型时只取打哈欠类别并映射编号"""
+        return remap_detections(detection, self.yawn_class_map) if self.unified else detection
+
+    def full_requests(self, frame, run_eye=True, run_yawn=True):
+        """整帧推理请求：两个模型都跑在完整画面上，统一模型只推理一次"""
+        if self.unified:
+            return [(self.detecteye, self.conf, 'frame', frame)]
+        requests = []
+        if run_eye:
+            requests.append((self.detecteye, self.conf, 'eye', frame))
+        if run_yawn:
+            requests.append((self.detectyawn, self.conf, 'yawn', frame))
+        return requests
+
+    def roi_requests(self, rois, run_eye=True, run_yawn=True, decided=()):
+        """ROI推理请求：空的裁剪区域和已由几何判定的区域（decided）跳过"""
+        keys = (('left_eye', 'right_eye') if run_eye else ()) + (('mouth',) if run_yawn else ())
+        return [(self.detectyawn if key == 'mouth' else self.detecteye, self.roi_conf, key, rois[key])
+                for key in keys if key not in decided and rois[key].size > 0]
+
+    def batch_requests(self, requests):
+        """
+        按模型把推理请求合成批次，每个模型只调用一次 predict：
+        左右眼裁剪同批推理；若眼睛和嘴部使用同一个模型，嘴部也并入同一批次。
+        返回 [(模型, 置信度阈值, [key], [图像])]
+        """
+        batches = {}
+        for model, conf, key, image in requests:
+            batches.setdefault((id(model), conf), (model, conf, [], []))
+            batch = batches[(id(model), conf)]
+            batch[2].append(key)
+            batch[3].append(image)
+        return list(batches.values())
+
+    def infer(self, requests):
+        """同步推理，返回 {请求key: 检测结果}"""
+        detections = {}
+        for model, conf, keys, images in self.batch_requests(requests):
+            with self.profiler.stage(self.model_stage(model)):
+                results = model.predict(images, conf=conf)
+            detections.update(zip(keys, results))
+        return detections
+
+    def submit(self, requests):
+        """
+        与 infer 相同但不等待结果：后端支持 submit（多进程推理）时立即返回 Future，
+        多帧可以同时在不同的工作进程中推理；其他后端仍在这里同步完成。
+        返回值交给 collect 取得 {请求key: 检测结果}
+        """
+        pending = []
+        for model, conf, keys, images in self.batch_requests(requests):
+            if hasattr(model, "submit"):
+                pending.append((model, keys, model.submit(images, conf=conf)))
+            else:
+                with self.profiler.stage(self.model_stage(model)):
+                    pending.append((model, keys, model.predict(images, conf=conf)))
+        return pending
+
+    def collect(self, pending):
+        detections = {}
+        for model, keys, results in pending:
+            if isinstance(results, Future):
+                with self.profiler.stage(self.model_stage(model)):  # 等待工作进程的时间
+                    results = results.result()
+            detections.update(zip(keys, results))
+        return detections
+
+    def decode(self, detections, run_eye=True, run_yawn=True):
+        """把检测结果解码为眼睛/打哈欠状态"""
+        with self.profiler.stage("postprocess"):
+            if self.mode == "roi":
+                self.decode_rois(detections)
+            else:
+                self.decode_full(detections, run_eye, run_yawn)
+
+    def decode_full(self, detections, run_eye=True, run_yawn=True):
+        if run_eye:
+            xyxy, confidences, class_ids = self.eye_detections(detections.get('eye', detections.get('frame')))
+            if self.debug_mode and len(confidences):
+                log.info("eye_boxes", "👁️ 眼睛检测框: {}",
+                         [(int(cls), round(float(conf), 3)) for conf, cls in zip(confidences, class_ids)])
+            self.left_eye_state, self.right_eye_state = decode_eyes_full(xyxy, confidences, class_ids)
+
+        if run_yawn:
+            _, confidences, class_ids = self.yawn_detections(detections.get('yawn', detections.get('frame')))
+            self.yawn_state = decode_yawn_full(confidences, class_ids, self.yawn_state)
+
+    def apply_geometry(self, states):
+        """写入关键点几何直接判定的状态"""
+        if 'left_eye' in states:
+            self.left_eye_state = states['left_eye']
+        if 'right_eye' in states:
+            self.right_eye_state = states['right_eye']
+        if 'mouth' in states:
+            self.yawn_state = states['mouth']
+
+    def decode_rois(self, detections):
+        """把各ROI的检测结果解码为状态，没有结果的ROI保持原状态"""
+        if 'left_eye' in detections:
+            _, confidences, class_ids = self.eye_detections(detections['left_eye'])
+            self.left_eye_state = decode_eye_roi(confidences, class_ids, self.left_eye_state)
+        if 'right_eye' in detections:
+            _, confidences, class_ids = self.eye_detections(detections['right_eye'])
+            self.right_eye_state = decode_eye_roi(confidences, class_ids, self.right_eye_state)
+        if 'mouth' in detections:
+            _, confidences, class_ids = self.yawn_detections(detections['mouth'])
+            self.yawn_state = decode_yawn_roi(confidences, class_ids, self.yawn_state)
+
+    def begin_frame(self, frame, timestamp=None):
+        """
+        处理单帧的前半部分：调度、定位人脸，生成本帧的推理请求。
+        推理由调用方完成（单路直接调用 infer，多路合并批次），再交给 end_frame。
+        """
+        start_time = time.time()
+        timestamp = start_time if timestamp is None else timestamp
+        frame_index = self.frame_index
+        job = FrameJob(FrameResult(frame_index, timestamp), start_time, self.generation)
+        self.frame_index += 1
+
+        # 按调度决定本帧运行哪些检测器，未运行的沿用上一状态
+        with self.scheduler_lock:
+            run_eye = self.scheduler.is_due("eye", frame_index)
+            run_yawn = self.scheduler.is_due("yawn", frame_index)
+        if self.unified and (run_eye or run_yawn):
+            # 统一模型一次推理同时得到两类结果
+            run_eye = run_yawn = True
+
+        if self.mode == "roi":
+            with self.tracker_lock:
+                points, job.result.landmarks_refreshed, geometry_points = self.locate_points(frame)
+            rois = crop_rois(frame, points) if points is not None else None
+            if rois is None:
+                run_eye = run_yawn = False
+            else:
+                job.result.face_found = True
+                if geometry_points is not None:
+                    # EAR/MAR 明显时直接判定（不受调度限制），模糊区间才交给 YOLO
+                    with self.profiler.stage("geometry"):
+                        job.geometry_states = self.geometry.classify(geometry_points)
+                    self.geometry_decided_counter.inc(len(job.geometry_states))
+                job.requests = self.roi_requests(rois, run_eye, run_yawn, job.geometry_states)
+                if geometry_points is not None:
+                    # 只统计调度本来就要推理、几何又无法判定而交给 YOLO 的区域
+                    self.geometry_fallback_counter.inc(len(job.requests))
+        else:
+            job.result.face_found = True
+            if run_eye or run_yawn:
+                job.requests = self.full_requests(frame, run_eye, run_yawn)
+
+        # 安排运行时立即记下运行帧号：分阶段执行时定位会领先推理好几帧，
+        # 等 end_frame 再记录的话这几帧都会被当成到期而重复推理
+        with self.scheduler_lock:
+            if job.generation == self.generation:
+                if run_eye:
+                    self.scheduler.mark("eye", frame_index)
+                if run_yawn:
+                    self.scheduler.mark("yawn", frame_index)
+        job.run_eye = run_eye
+        job.run_yawn = run_yawn
+        return job
+
+    def infer_error(self, error):
+        """ROI模式推理出错时本帧沿用上一状态，全图模式向上抛出"""
+        if self.mode != "roi":
+            raise error
+        log.info("roi_error", "❌ ROI推理错误: {}", error)
+
+    def submit_job(self, job):
+        """提交单帧的推理请求，结果由 collect_job 取回"""
+        try:
+            job.pending = self.submit(job.requests)
+        except Exception as e:
+            self.infer_error(e)
+            job.pending = []
+
+    def collect_job(self, job):
+        try:
+            return self.collect(job.pending)
+        except Exception as e:
+            self.infer_error(e)
+            return {}
+        finally:
+            job.pending = []
+
+    def infer_job(self, job):
+        """运行单帧的推理请求并等待结果"""
+        self.submit_job(job)
+        return self.collect_job(job)
+
+    def process_frame(self, frame, timestamp=None):
+        """处理单帧：推理、更新统计并判定是否需要警告，timestamp 为采集时间（秒）"""
+        job = self.begin_frame(frame, timestamp)
+        return self.end_frame(job, self.infer_job(job))
+
+    def end_frame(self, job, detections):
+        """处理单帧的后半部分：解码检测结果、更新统计并判定是否需要警告"""
+        result = job.result
+        timestamp = result.timestamp
+        frame_index = result.frame_index
+        run_eye, run_yawn = job.run_eye, job.run_yawn
+
+        if not result.face_found:
+            self.stats.skip(timestamp)
+            self.faces_lost_counter.inc()
+        else:
+            self.decode(detections, run_eye, run_yawn)
+            self.apply_geometry(job.geometry_states)
+            with self.profiler.stage("statistics"):
+                self.stats.update(self.left_eye_state, self.right_eye_state, self.yawn_state, timestamp)
+
+        with self.scheduler_lock:
+            # 推理结果反馈状态变化（加速窗口）；重置前已在处理中的帧帧号是旧的，不再反馈
+            if job.generation == self.generation:
+                if run_eye:
+                    self.scheduler.record("eye", frame_index, (self.left_eye_state, self.right_eye_state))
+                if run_yawn:
+                    self.scheduler.record("yawn", frame_index, self.yawn_state)
+        result.eye_inferred = run_eye
+        result.yawn_inferred = run_yawn
+
+        result.left_eye_state = self.left_eye_state
+        result.right_eye_state = self.right_eye_state
+        result.yawn_state = self.yawn_state
+        result.blinks = self.stats.blinks
+        result.microsleeps = self.stats.microsleeps
+        result.yawns = self.stats.yawns
+        result.yawn_duration = self.stats.yawn_duration
+        analytics = self.stats.analytics
+        result.perclos = self.stats.perclos
+        result.perclos_short = analytics.perclos_short
+        result.perclos_long = analytics.perclos_long
+        result.blink_rate = analytics.blink_rate
+        result.mean_blink_duration = analytics.mean_blink_duration
+        result.yawn_rate = analytics.yawn_rate
+        left, right = self.stats.blink_tracker.left, self.stats.blink_tracker.right
+        result.left_blink_p50, result.left_blink_p90 = left.durations.p50, left.durations.p90
+        result.right_blink_p50, result.right_blink_p90 = right.durations.p50, right.durations.p90
+        result.left_interval_p50, result.left_interval_p90 = left.intervals.p50, left.intervals.p90
+        result.right_interval_p50, result.right_interval_p90 = right.intervals.p50, right.intervals.p90
+        # 每帧只评估一次疲劳规则，订阅者读取 result.verdict
+        result.verdict = self.rules.evaluate(self.stats)
+        result.is_drowsy = result.verdict.is_drowsy
+
+        # 警告判定，确保警告不会太频繁（按帧时间戳计算，离线视频同样适用）
+        if result.is_drowsy and (self.last_alert_time is None or
+                                 timestamp - self.last_alert_time > self.alert_cooldown):
+            result.alert_triggered = True
+            self.last_alert_time = timestamp
+
+        result.detection_time = time.time() - job.start_time
+        self.frames_counter.inc()
+        self.latency_histogram.observe(result.detection_time)
+        self.microsleeps_gauge.set(result.microsleeps)
+        self.yawn_duration_gauge.set(result.yawn_duration)
+        self.perclos_gauge.set(result.perclos_long)
+        self.blink_p90_gauge.set(max(result.left_blink_p90, result.right_blink_p90))
+        if result.landmarks_refreshed:
+            self.landmarks_counter.inc()
+        if result.alert_triggered:
+            self.alerts_counter.inc()
+        if self.debug_mode:
+            # 参数在后台线程格式化，且每秒最多输出一条
+            log.info("frame", "📊 眼睛={}, 打哈欠={}, 眨眼={}次, 闭眼={:.2f}秒, 打哈欠={}次, 耗时={:.3f}秒",
+                     state_name(result.left_eye_state), state_name(result.yawn_state), result.blinks,
+                     result.microsleeps, result.yawns, result.detection_time)
+
+        self.latest_result = result
+        return result
+
+    def run(self, cap, pace=0.0, stop_on_eof=True):
+        """
+        在当前线程中循环：取最新帧 → 处理 → 发布，直到 stop() 或视频结束。
+        cap 可以是 cv2.VideoCapture（自动包装为 FrameCapture）或 FrameCapture；
+        处理跟不上采集时只处理最新一帧，统计按采集时间累积。
+        """
+        capture = cap if isinstance(cap, FrameCapture) else \
+            FrameCapture(cap, stop_on_eof=stop_on_eof, name=f"{self.name}.capture")
+        self.capture = capture.start()
+        try:
+            while not self.stop_event.is_set():
+                item = capture.read(timeout=0.5)
+                if item is None:
+                    if capture.finished:
+                        break
+                    continue
+                try:
+                    result = self.process_frame(item.frame, item.timestamp)
+                    self.publish(item.frame, result)
+                    self.capture_latency_histogram.observe(time.time() - item.timestamp)
+                except Exception as e:
+                    log.info("process_error", "❌ 检测处理错误: {}", e)
+                if pace:
+                    time.sleep(pace)
+        finally:
+            capture.stop()
+
+    def start(self, cap, pace=0.0, stop_on_eof=True):
+        """在后台线程中运行检测循环"""
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, args=(cap, pace, stop_on_eof), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.capture is not None:
+            self.capture.stop()  # 唤醒等待新帧的处理线程
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+        self.thread = None
+
+    def close(self):
+        """
+        停止检测并释放资源：自己加载的模型（多进程推理的工作进程和共享内存）和 FaceMesh。
+        共用的模型由加载它的流水线释放。关闭后需重新 load_models 才能使用
+        """
+        self.stop()
+        if self.owns_models:
+            models = {id(model): model for model in (self.detecteye, self.detectyawn) if model is not None}
+            for model in models.values():
+                if hasattr(model, "close"):
+                    model.close()
+        if self.face_mesh is not None:
+            self.face_mesh.close()
+            self.face_mesh = None
+        self.detecteye = self.detectyawn = None
+        self.owns_models = False
+        self.model_loaded = False
+
+
+def main():
+    """无界面运行：打开摄像头，全速检测并每秒打印一次帧率"""
+    pipeline = DetectionPipeline(mode="full")
+    pipeline.load_models()
+    cap = open_camera()
+    if cap is None:
+        return
+
+    counter = {'frames': 0, 'start': time.time()}
+
+    def report(frame, result):
+        counter['frames'] += 1
+        elapsed = time.time() - counter['start']
+        if elapsed > 1.0:
+            print(f"FPS: {counter['frames'] / elapsed:.1f} | 眼睛={state_name(result.left_eye_state)} "
+                  f"打哈欠={state_name(result.yawn_state)} 闭眼={result.microsleeps:.2f}秒")
+            counter['frames'] = 0
+            counter['start'] = time.time()
+        if result.alert_triggered:
+            print("⚠️ 检测到疲劳状态！")
+
+    pipeline.subscribe(report)
+    try:
+        pipeline.run(cap)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pipeline.close()
+        cap.release()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+滑动窗口疲劳指标
+
+FatigueStatistics 的计数器只会增长或按固定速度回落，反映不出“最近一段时间”的状态。
+这里按时间把每帧的观测累加到固定大小的环形缓冲区（每桶 bucket_seconds 秒），
+并为每个窗口维护一份累计和：新桶进入时减去滑出窗口的旧桶，
+每帧 O(1)，内存与运行时长无关，十几个小时的行程也一样。
+
+- PERCLOS：窗口内闭眼时间占有效观测时间的比例（短窗口默认1分钟，长窗口默认5分钟）
+- 眨眼频率（次/分钟）和平均眨眼时长（秒），按短窗口计算
+- 打哈欠频率（次/分钟），按长窗口计算（哈欠较少，短窗口波动太大）
+
+未检测到人脸的帧只推进时间，不计入观测时间。
+"""
+import numpy as np
+
+from config import ANALYTICS_CONFIG
+
+# 每个桶累加的字段
+CLOSED_TIME = 0  # 闭眼时间（秒）
+OBSERVED_TIME = 1  # 有效观测时间（秒）
+BLINKS = 2  # 本桶内结束的眨眼次数
+BLINK_TIME = 3  # 这些眨眼的总时长（秒）
+YAWNS = 4  # 本桶内开始的哈欠次数
+NUM_FIELDS = 5
+
+SHORT = 0
+LONG = 1
+
+
+class SlidingWindows:
+    """按时间分桶的环形缓冲区，同时维护多个窗口（单位：秒）的累计值"""
+
+    def __init__(self, windows, bucket_seconds=1.0, fields=NUM_FIELDS):
+        self.bucket_seconds = bucket_seconds
+        self.sizes = [max(1, int(round(window / bucket_seconds))) for window in windows]
+        self.capacity = max(self.sizes)
+        self.buckets = np.zeros((self.capacity, fields))
+        self.sums = np.zeros((len(self.sizes), fields))
+        self.current = None  # 当前桶的绝对编号
+
+    def reset(self):
+        self.buckets.fill(0.0)
+        self.sums.fill(0.0)
+        self.current = None
+
+    def advance(self, timestamp):
+        """把当前桶推进到 timestamp 所在的桶，滑出各窗口的旧桶从累计和中减去"""
+        index = int(timestamp // self.bucket_seconds)
+        if self.current is None or index < self.current or index - self.current >= self.capacity:
+            # 首帧、时间倒退（换了视频）或间隔超过最长窗口：全部过期
+            self.buckets.fill(0.0)
+            self.sums.fill(0.0)
+            self.current = index
+            return
+        # 间隔不超过 capacity 个桶，均摊下来每帧 O(1)
+        while self.current < index:
+            self.current += 1
+            slot = self.current % self.capacity
+            for window, size in enumerate(self.sizes):
+                self.sums[window] -= self.buckets[(self.current - size) % self.capacity]
+            self.buckets[slot] = 0.0
+
+    def add(self, field, value):
+        self.buckets[self.current % self.capacity, field] += value
+        self.sums[:, field] += value
+
+    def total(self, window, field):
+        # 浮点减法的累积误差可能让结果略小于0
+        return max(float(self.sums[window, field]), 0.0)
+
+
+class FatigueAnalytics:
+    def __init__(self, config=None):
+        cfg = config or ANALYTICS_CONFIG
+        self.min_observed = cfg['min_observed']
+        self.windows = SlidingWindows((cfg['short_window'], cfg['long_window']), cfg['bucket_seconds'])
+        self.reset()
+
+    def reset(self):
+        self.windows.reset()
+        self.closure_start = None  # 当前这次闭眼开始的时间
+        self.yawning = False
+
+    def skip(self, timestamp):
+        """未检测到人脸的帧：只推进时间"""
+        self.windows.advance(timestamp)
+
+    def update(self, timestamp, dt, eyes_closed, yawning):
+        """记录一帧：dt 为距上一帧的秒数（已限幅），eyes_closed/yawning 为本帧状态"""
+        windows = self.windows
+        windows.advance(timestamp)
+        windows.add(OBSERVED_TIME, dt)
+        if eyes_closed:
+            windows.add(CLOSED_TIME, dt)
+            if self.closure_start is None:
+                self.closure_start = timestamp
+        elif self.closure_start is not None:
+            # 睁眼时一次眨眼结束，时长从第一帧闭眼算到第一帧睁眼
+            windows.add(BLINKS, 1)
+            windows.add(BLINK_TIME, timestamp - self.closure_start)
+            self.closure_start = None
+
+        if yawning and not self.yawning:
+            windows.add(YAWNS, 1)
+        self.yawning = yawning
+
+    def observed(self, window):
+        return self.windows.total(window, OBSERVED_TIME)
+
+    def ready(self, window):
+        """窗口内的有效观测时间足够时，比例和频率才有意义"""
+        return self.observed(window) >= self.min_observed
+
+    def perclos(self, window):
+        observed = self.observed(window)
+        return self.windows.total(window, CLOSED_TIME) / observed if observed > 0 else 0.0
+
+    def rate_per_minute(self, window, field):
+        observed = self.observed(window)
+        return self.windows.total(window, field) * 60.0 / observed if observed > 0 else 0.0
+
+    @property
+    def perclos_short(self):
+        return self.perclos(SHORT)
+
+    @property
+    def perclos_long(self):
+        return self.perclos(LONG)
+
+    @property
+    def blink_rate(self):
+        return self.rate_per_minute(SHORT, BLINKS)
+
+    @property
+    def mean_blink_duration(self):
+        blinks = self.windows.total(SHORT, BLINKS)
+        return self.windows.total(SHORT, BLINK_TIME) / blinks if blinks >= 1 else 0.0
+
+    @property
+    def yawn_rate(self):
+        return self.rate_per_minute(LONG, YAWNS)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+疲劳规则
+
+各界面原先各自比较 microsleeps/yawn_duration/yawns 与阈值，写法和数值逐渐不一致。
+这里按 FATIGUE_RULES_CONFIG 和 DROWSINESS_THRESHOLDS 一次性编译出规则表，
+流水线每帧只评估一次，结果（FatigueVerdict）随 FrameResult 发布，界面和警告判定直接读取：
+
+- 某个指标超过阈值为“危险”（is_drowsy），超过 warning_levels 中的警告值为“警告”
+  （警告值沿用原状态面板的条件，未列出的规则没有警告等级）
+- rule 为离阈值最近（或超出最多）的规则，margin 为其取值减阈值（正数表示已超出）
+"""
+import operator
+
+from config import DROWSINESS_THRESHOLDS, FATIGUE_RULES_CONFIG
+
+NORMAL = 0
+WARNING = 1
+DANGER = 2
+LEVEL_NAMES = ("正常", "警告", "危险")
+
+
+class FatigueVerdict:
+    __slots__ = ('level', 'rule', 'value', 'threshold', 'ratio')
+
+    def __init__(self, level, rule, value, threshold, ratio):
+        self.level = level
+        self.rule = rule  # 规则名称，没有任何规则时为 None
+        self.value = value
+        self.threshold = threshold
+        self.ratio = ratio  # 取值 / 阈值
+
+    @property
+    def level_name(self):
+        return LEVEL_NAMES[self.level]
+
+    @property
+    def is_drowsy(self):
+        return self.level == DANGER
+
+    @property
+    def margin(self):
+        return self.value - self.threshold
+
+
+NORMAL_VERDICT = FatigueVerdict(NORMAL, None, 0.0, 0.0, 0.0)
+
+
+class FatigueRules:
+    def __init__(self, thresholds=None, config=None):
+        thresholds = thresholds or DROWSINESS_THRESHOLDS
+        cfg = config or FATIGUE_RULES_CONFIG
+        warning_levels = cfg.get('warning_levels', {})
+        # (名称, 指标, 取值函数, 阈值, 警告值)；阈值缺失或不大于0的规则不参与，没有警告值时为 None
+        self.rules = tuple(
+            (name, metric, operator.attrgetter(metric), float(thresholds[key]), warning_levels.get(name))
+            for name, (metric, key) in cfg['rules'].items()
+            if thresholds.get(key) is not None and thresholds[key] > 0
+        )
+
+    def evaluate(self, metrics):
+        """按 metrics（FatigueStatistics、FrameResult 或有相同属性的对象）的当前取值给出判定"""
+        best = None
+        best_ratio = -1.0
+        warning = False
+        for name, _, get, threshold, warning_level in self.rules:
+            value = get(metrics)
+            ratio = value / threshold
+            if ratio > best_ratio:
+                best, best_ratio, best_value, best_threshold = name, ratio, value, threshold
+            if warning_level is not None and value > warning_level:
+                warning = True
+        if best is None:
+            return NORMAL_VERDICT
+
+        if best_ratio > 1.0:
+            level = DANGER
+        elif warning:
+            level = WARNING
+        else:
+            level = NORMAL
+        return FatigueVerdict(level, best, float(best_value), best_threshold, best_ratio)
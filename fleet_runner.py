@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+多路视频检测
+
+一个进程同时监测多路摄像头或视频文件：
+- YOLO 模型只加载一份，所有视频流共用
+- 每轮把各路新到的帧的推理请求合并成批次，每个模型只调用一次 predict
+- 每路视频有独立的统计、调度、跟踪和警告冷却（各自一个 DetectionPipeline）
+- 每路由 FrameCapture 在后台读取，只处理各路的最新一帧
+- 每路的状态变化和警告写入各自的会话日志（SESSION_LOG_CONFIG）
+
+    python fleet_runner.py 0 1 2                  # 三个摄像头
+    python fleet_runner.py 0 rig2.mp4 --mode roi  # 摄像头和视频文件混用
+"""
+import argparse
+import threading
+import time
+
+import cv2
+
+from config import SESSION_LOG_CONFIG
+from detection_pipeline import DetectionPipeline, open_camera
+from frame_capture import FrameCapture
+from metrics import REGISTRY, log
+from session_log import SessionRecorder
+
+
+def open_source(source, name, notify=None):
+    """打开摄像头编号或视频文件，视频文件按帧率实时回放"""
+    is_file = not isinstance(source, int)
+    cap = cv2.VideoCapture(source) if is_file else open_camera([source])
+    if cap is None or not cap.isOpened():
+        raise IOError(f"无法打开视频源: {source}")
+    return FrameCapture(cap, stop_on_eof=is_file, realtime=is_file, name=f"{name}.capture", notify=notify)
+
+
+class FleetStream:
+    def __init__(self, name, capture, pipeline):
+        self.name = name
+        self.capture = capture
+        self.pipeline = pipeline
+        self.recorder = None
+        if SESSION_LOG_CONFIG['enabled']:
+            self.recorder = SessionRecorder.open(name)
+            pipeline.subscribe(self.recorder.on_result)
+
+
+class FleetRunner:
+    def __init__(self, sources, mode="full"):
+        self.mode = mode
+        self.sources = sources
+        self.streams = []
+        # 持有共用模型并执行合并批次的推理，耗时记入 fleet.stage.*
+        self.engine = DetectionPipeline(mode="full", name="fleet")
+        self.batches_counter = REGISTRY.counter("fleet.batches")
+        self.batched_frames_counter = REGISTRY.counter("fleet.batched_frames")
+        self.stop_event = threading.Event()
+        self.frame_ready = threading.Event()  # 任一路有新帧或采集结束
+
+    def open(self):
+        """打开所有视频源并加载模型，模型只加载一次；任一路打开失败时释放已打开的"""
+        try:
+            self.engine.load_models()
+            for i, source in enumerate(self.sources):
+                name = f"stream{i}"
+                pipeline = DetectionPipeline(mode=self.mode, name=name)
+                pipeline.load_models(shared=self.engine)
+                capture = open_source(source, name, self.frame_ready)
+                try:
+                    self.streams.append(FleetStream(name, capture.start(), pipeline))
+                except Exception:
+                    capture.release()
+                    raise
+                print(f"📹 {name}: {source}")
+        except Exception:
+            self.close()
+            raise
+
+    def subscribe(self, callback):
+        """订阅所有视频流的结果，callback(name, frame, result) 在检测线程中调用"""
+        for stream in self.streams:
+            stream.pipeline.subscribe(lambda frame, result, name=stream.name: callback(name, frame, result))
+
+    def step(self):
+        """处理各路的最新帧一次，返回本轮处理的帧数"""
+        jobs = []
+        for stream in self.streams:
+            item = stream.capture.read_nowait()
+            if item is None:
+                continue
+            jobs.append((stream, item.frame, stream.pipeline.begin_frame(item.frame, item.timestamp)))
+        if not jobs:
+            return 0
+
+        # 所有视频流的推理请求合并，每个模型一次 predict
+        requests = []
+        for index, (stream, _, job) in enumerate(jobs):
+            requests.extend((model, conf, (index, key), image) for model, conf, key, image in job.requests)
+        failed = False
+        try:
+            detections = self.engine.infer(requests)
+        except Exception as e:
+            log.info("fleet_infer_error", "❌ 多路推理错误: {}", e)
+            detections = {}
+            failed = True
+        self.batches_counter.inc()
+        self.batched_frames_counter.inc(len(jobs))
+
+        per_job = [{} for _ in jobs]
+        for (index, key), detection in detections.items():
+            per_job[index][key] = detection
+        for (stream, frame, job), job_detections in zip(jobs, per_job):
+            if failed and job.requests and self.mode != "roi":
+                # 与 DetectionPipeline.infer_error 相同：ROI模式本帧沿用上一状态，全图模式丢弃这一帧
+                continue
+            try:
+                result = stream.pipeline.end_frame(job, job_detections)
+                stream.pipeline.publish(frame, result)
+            except Exception as e:
+                log.info(f"process_error.{stream.name}", "❌ {} 检测处理错误: {}", stream.name, e)
+        return len(jobs)
+
+    def run(self):
+        while not self.stop_event.is_set():
+            # 先清除再取帧：取帧之后到达的新帧会重新 set，不会错过
+            self.frame_ready.clear()
+            if not self.step():
+                if all(stream.capture.finished for stream in self.streams):
+                    break
+                self.frame_ready.wait(timeout=0.5)
+
+    def close(self):
+        self.stop_event.set()
+        self.frame_ready.set()
+        for stream in self.streams:
+            stream.capture.release()
+            stream.pipeline.close()
+            if stream.recorder is not None:
+                stream.recorder.close()
+        self.engine.close()  # 共用的模型由 engine 加载，最后释放
+
+
+def parse_source(text):
+    """纯数字视为摄像头编号，否则为视频文件路径"""
+    return int(text) if text.isdigit() else text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多路摄像头/视频同时进行疲劳检测，模型共用")
+    parser.add_argument("sources", nargs="+", help="摄像头编号或视频文件")
+    parser.add_argument("--mode", choices=("full", "roi"), default="full", help="检测模式")
+    args = parser.parse_args()
+
+    runner = FleetRunner([parse_source(s) for s in args.sources], args.mode)
+    runner.open()
+
+    counters = {stream.name: 0 for stream in runner.streams}
+    report = {'start': time.time()}
+
+    def on_result(name, frame, result):
+        counters[name] += 1
+        if result.alert_triggered:
+            print(f"⚠️ {name} 检测到疲劳状态！闭眼={result.microsleeps:.2f}秒 打哈欠={result.yawns}次")
+        elapsed = time.time() - report['start']
+        if elapsed > 5.0:
+            print(" | ".join(f"{n}: {c / elapsed:.1f} fps" for n, c in counters.items()))
+            for n in counters:
+                counters[n] = 0
+            report['start'] = time.time()
+
+    runner.subscribe(on_result)
+    try:
+        runner.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        runner.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+最新帧采集
+
+摄像头在后台线程中持续读取，每帧带上采集时间和序号放入单槽缓冲区：
+消费者每次拿到的都是最新一帧，检测跟不上时旧帧直接被覆盖（计为丢帧），
+不会像队列那样越积越多，端到端延迟始终不超过一帧的处理时间。
+
+    capture = FrameCapture(cap).start()
+    item = capture.read(timeout=0.5)   # CapturedFrame(frame, timestamp, sequence)
+"""
+import threading
+import time
+
+import cv2
+
+from metrics import REGISTRY, log
+
+
+class CapturedFrame:
+    __slots__ = ('frame', 'timestamp', 'sequence')
+
+    def __init__(self, frame, timestamp, sequence):
+        self.frame = frame
+        self.timestamp = timestamp  # 采集时间（time.time()，秒）
+        self.sequence = sequence  # 从1开始的采集序号，不连续说明中间丢了帧
+
+
+class LatestFrameSlot:
+    """单槽缓冲：put 覆盖尚未取走的旧数据并计为丢弃，get 总是拿到最新的"""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.item = None
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, item):
+        """放入新数据，覆盖了未取走的旧数据时返回 True"""
+        with self.condition:
+            overwritten = self.item is not None
+            if overwritten:
+                self.dropped += 1
+            self.item = item
+            self.condition.notify_all()
+            return overwritten
+
+    def get(self, timeout=None):
+        """等待并取走最新数据，超时或已关闭返回 None"""
+        with self.condition:
+            if self.item is None and not self.closed:
+                self.condition.wait(timeout)
+            item, self.item = self.item, None
+            return item
+
+    def get_nowait(self):
+        with self.condition:
+            item, self.item = self.item, None
+            return item
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class FrameCapture:
+    """
+    持有 cv2.VideoCapture 并在后台线程中读取。
+    stop_on_eof=True 时读取失败即结束（视频文件），否则记录后重试（摄像头）；
+    realtime=True 时按视频帧率读取，让视频文件像摄像头一样实时回放；
+    notify 为 threading.Event 时，新帧到达或采集结束都会 set()，多路采集可共用一个以便同时等待。
+    """
+
+    def __init__(self, cap, stop_on_eof=False, realtime=False, name="capture", notify=None):
+        self.cap = cap
+        self.name = name
+        self.stop_on_eof = stop_on_eof
+        self.notify = notify
+        fps = cap.get(cv2.CAP_PROP_FPS) if realtime else 0
+        self.frame_interval = 1.0 / fps if fps and fps > 0 else 0.0
+
+        self.slot = LatestFrameSlot()
+        self.sequence = 0
+        self.finished = False
+        self.stop_event = threading.Event()
+        self.thread = None
+
+        self.captured_counter = REGISTRY.counter(f"{name}.captured")
+        self.dropped_counter = REGISTRY.counter(f"{name}.dropped")
+        self.read_errors_counter = REGISTRY.counter(f"{name}.read_errors")
+
+    @property
+    def dropped(self):
+        """被更新的帧覆盖、未经处理的帧数"""
+        return self.slot.dropped
+
+    def start(self):
+        if self.thread is None:
+            self.stop_event.clear()
+            self.slot = LatestFrameSlot()
+            self.finished = False
+            self.thread = threading.Thread(target=self.capture_loop, daemon=True)
+            self.thread.start()
+        return self
+
+    def capture_loop(self):
+        next_time = time.time()
+        while not self.stop_event.is_set():
+            ret, frame = self.cap.read()
+            timestamp = time.time()
+            if not ret:
+                if self.stop_on_eof:
+                    break
+                self.read_errors_counter.inc()
+                log.info(f"{self.name}.read_error", "⚠️ 无法读取摄像头画面")
+                time.sleep(0.1)
+                continue
+
+            self.sequence += 1
+            self.captured_counter.inc()
+            if self.slot.put(CapturedFrame(frame, timestamp, self.sequence)):
+                self.dropped_counter.inc()
+            if self.notify is not None:
+                self.notify.set()
+            if self.frame_interval:
+                next_time += self.frame_interval
+                time.sleep(max(0.0, next_time - time.time()))
+        self.finished = True
+        self.slot.close()
+        if self.notify is not None:
+            self.notify.set()
+
+    def read(self, timeout=None):
+        """等待下一帧（总是最新的一帧），超时或采集结束返回 None"""
+        return self.slot.get(timeout)
+
+    def read_nowait(self):
+        return self.slot.get_nowait()
+
+    def stop(self):
+        """停止采集线程，摄像头仍保持打开，可再次 start"""
+        self.stop_event.set()
+        self.slot.close()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+        self.thread = None
+
+    def release(self):
+        self.stop()
+        self.cap.release()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+视频面板显示
+
+原先每帧都 cv2.resize → cvtColor → Image.fromarray → ImageTk.PhotoImage，
+约33fps下每帧分配好几块整帧缓冲区和一个新的 Tk 图像对象。这里：
+- DisplayBuffers：缩放和 RGBA 缓冲区预先分配，只在面板或画面尺寸变化时重建
+- TkVideoPanel：PIL 图像直接包装 RGBA 缓冲区（PIL 只能零拷贝包装4通道数据），
+  始终更新同一个 PhotoImage
+"""
+import cv2
+import numpy as np
+from PIL import Image
+
+
+class DisplayBuffers:
+    """按面板大小缩放并转换为 RGBA，输出写入复用的缓冲区"""
+
+    def __init__(self, fill=0.95):
+        self.fill = fill  # 留出边距，避免图像撑大面板后又触发缩放
+        self.panel_size = None
+        self.frame_shape = None
+        self.size = None
+        self.resized = None
+        self.rgba = None
+
+    def set_panel_size(self, width, height):
+        self.panel_size = (width, height) if width > 1 and height > 1 else None
+        self.frame_shape = None  # 下一帧重新计算输出尺寸
+
+    def prepare(self, frame_shape):
+        """画面或面板尺寸变化时重新计算输出尺寸并分配缓冲区，返回是否重建"""
+        if frame_shape == self.frame_shape:
+            return False
+        height, width = frame_shape[:2]
+        if self.panel_size is not None:
+            scale = min(self.panel_size[0] / width, self.panel_size[1] / height) * self.fill
+            size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        else:
+            size = (width, height)
+
+        self.frame_shape = frame_shape
+        if size != self.size:
+            self.size = size
+            self.resized = np.empty((size[1], size[0], 3), dtype=np.uint8)
+            self.rgba = np.empty((size[1], size[0], 4), dtype=np.uint8)
+            return True
+        return False
+
+    def convert(self, frame):
+        """返回 RGBA 缓冲区（下一次 convert 时会被覆盖）"""
+        self.prepare(frame.shape)
+        if frame.shape[1::-1] != self.size:
+            cv2.resize(frame, self.size, dst=self.resized)
+            frame = self.resized
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGBA, dst=self.rgba)
+        return self.rgba
+
+
+class TkVideoPanel:
+    """把视频帧显示到 tk.Label 上，复用同一个 PhotoImage"""
+
+    def __init__(self, label, fill=0.95):
+        from PIL import ImageTk  # 依赖 tkinter，只在界面中导入
+        self.photo_class = ImageTk.PhotoImage
+        self.label = label
+        self.buffers = DisplayBuffers(fill)
+        self.image = None
+        self.photo = None
+        label.bind("<Configure>", self.on_resize, add="+")
+
+    def on_resize(self, event):
+        self.buffers.set_panel_size(event.width, event.height)
+
+    def show(self, frame):
+        rgba = self.buffers.convert(frame)
+        if self.photo is None or self.image.size != self.buffers.size:
+            # 尺寸变化时才重建：PIL 图像与 RGBA 缓冲区共享内存
+            self.image = Image.frombuffer("RGBA", self.buffers.size, rgba, "raw", "RGBA", 0, 1)
+            self.photo = self.photo_class(self.image)
+            self.label.config(image=self.photo)
+        else:
+            self.photo.paste(self.image)
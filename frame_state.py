@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+逐帧状态编码
+
+眼睛/嘴部状态原先是显示用的中文字符串，每帧用 in 比较元组。这里改为小整数（IntEnum），
+“是否闭眼/打哈欠”和闭眼权重按编号查表；显示文字只在绘制和导出时由 state_name 取得。
+编号同时用于会话日志和批量导出（FRAME_DTYPE），只能追加，不能改动已有编号。
+"""
+from enum import IntEnum
+
+
+class State(IntEnum):
+    UNKNOWN = 0  # 未检测
+    OPEN = 1  # 睁眼
+    MAYBE_OPEN = 2  # 可能睁眼
+    LIKELY_OPEN = 3  # 疑似睁眼
+    CLOSED = 4  # 闭眼
+    LIKELY_CLOSED = 5  # 疑似闭眼
+    MAYBE_CLOSED = 6  # 可能闭眼
+    NO_YAWN = 7  # 正常
+    YAWN = 8  # 打哈欠
+    LIKELY_YAWN = 9  # 疑似打哈欠
+
+
+STATE_NAMES = ("未检测", "睁眼", "可能睁眼", "疑似睁眼", "闭眼", "疑似闭眼", "可能闭眼",
+               "正常", "打哈欠", "疑似打哈欠")
+
+# 以下按状态编号查表
+EYE_CLOSED = tuple(state in (State.CLOSED, State.LIKELY_CLOSED, State.MAYBE_CLOSED) for state in State)
+YAWNING = tuple(state in (State.YAWN, State.LIKELY_YAWN) for state in State)
+# 闭眼时长按真实经过的时间累积（秒/秒），越不确定的闭眼状态累积越慢
+MICROSLEEP_WEIGHTS = tuple({State.CLOSED: 1.0, State.LIKELY_CLOSED: 2 / 3,
+                            State.MAYBE_CLOSED: 1 / 3}.get(state, 0.0) for state in State)
+
+
+def state_name(state):
+    """状态编号 → 显示文字"""
+    return STATE_NAMES[state] if 0 <= state < len(STATE_NAMES) else str(int(state))
@@ -0,0 +1,301 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+推理后端
+
+所有后端都提供同一个接口：
+    backend.predict(images, conf=0.25) -> [(xyxy, confidences, class_ids), ...]
+每张输入图片对应一组 numpy 数组，坐标为原图像素坐标。
+
+- ultralytics: 直接用 YOLO(best.pt) 做 PyTorch 推理（默认）
+- onnxruntime: 导出为 ONNX 后用 ONNX Runtime 在 CPU 上推理
+- openvino:    导出为 ONNX 后用 OpenVINO 在 CPU 上推理
+
+ONNX 模型可以用 datasets/images/val 中的图片做校准，静态量化为 INT8：
+
+    python inference_backend.py --int8
+
+可选依赖：pip install onnx onnxruntime（或 openvino）
+"""
+import argparse
+import glob
+import os
+
+import cv2
+import numpy as np
+
+from config import INFERENCE_CONFIG, MODEL_CONFIG
+
+BACKENDS = ("ultralytics", "onnxruntime", "openvino")
+
+
+def extract_detections(result):
+    """把单个 ultralytics Results 转成 (xyxy, confidences, class_ids) 三个 numpy 数组"""
+    if result is None or result.boxes is None or len(result.boxes) == 0:
+        return empty_detections()
+    boxes = result.boxes
+    return (boxes.xyxy.cpu().numpy(),
+            boxes.conf.cpu().numpy(),
+            boxes.cls.cpu().numpy().astype(np.int64))
+
+
+def empty_detections():
+    return np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int64)
+
+
+def letterbox(image, size):
+    """等比缩放并用灰色(114)填充到 size x size，返回 (画布, 缩放比例, (左, 上)填充)"""
+    h, w = image.shape[:2]
+    scale = min(size / h, size / w)
+    nh, nw = int(round(h * scale)), int(round(w * scale))
+    resized = cv2.resize(image, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    top, left = (size - nh) // 2, (size - nw) // 2
+    canvas = np.full((size, size, 3), 114, np.uint8)
+    canvas[top:top + nh, left:left + nw] = resized
+    return canvas, scale, (left, top)
+
+
+def preprocess(images, size):
+    """BGR 图片列表 → NCHW float32 批次（RGB，0~1）"""
+    blob = np.empty((len(images), 3, size, size), np.float32)
+    metas = []
+    for i, image in enumerate(images):
+        canvas, scale, pad = letterbox(image, size)
+        blob[i] = canvas[:, :, ::-1].transpose(2, 0, 1)
+        metas.append((scale, pad, image.shape[:2]))
+    blob *= 1.0 / 255.0
+    return blob, metas
+
+
+def postprocess(output, metas, conf=0.25, iou=0.7, max_det=300):
+    """
+    解码 YOLOv8 检测头输出 (B, 4+nc, N)：置信度过滤、按类别 NMS、坐标还原到原图
+    """
+    detections = []
+    for pred, (scale, (left, top), (h, w)) in zip(output, metas):
+        pred = pred.T
+        scores = pred[:, 4:]
+        class_ids = scores.argmax(1)
+        confidences = scores[np.arange(len(scores)), class_ids]
+        keep = confidences > conf
+        if not keep.any():
+            detections.append(empty_detections())
+            continue
+
+        xywh, confidences, class_ids = pred[keep, :4], confidences[keep], class_ids[keep]
+        xyxy = np.empty_like(xywh)
+        xyxy[:, :2] = xywh[:, :2] - xywh[:, 2:] / 2
+        xyxy[:, 2:] = xywh[:, :2] + xywh[:, 2:] / 2
+
+        # NMSBoxesBatched 需要 (x, y, w, h) 左上角格式
+        tlwh = np.concatenate([xyxy[:, :2], xywh[:, 2:]], axis=1)
+        indices = cv2.dnn.NMSBoxesBatched(tlwh.tolist(), confidences.tolist(),
+                                          class_ids.tolist(), conf, iou)
+        indices = np.array(indices, dtype=np.int64).reshape(-1)[:max_det]
+
+        xyxy = (xyxy[indices] - [left, top, left, top]) / scale
+        xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, w)
+        xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, h)
+        detections.append((xyxy.astype(np.float32),
+                           confidences[indices].astype(np.float32),
+                           class_ids[indices].astype(np.int64)))
+    return detections
+
+
+class UltralyticsBackend:
+    """PyTorch 推理（ultralytics YOLO）"""
+
+    def __init__(self, weights):
+        from ultralytics import YOLO
+        self.model = YOLO(weights)
+
+    def predict(self, images, conf=0.25):
+        if not images:
+            return []
+        results = self.model.predict(list(images), verbose=False, conf=conf)
+        return [extract_detections(result) for result in results]
+
+
+class ExportedModelBackend:
+    """
+    导出模型的公共前后处理。
+    子类必须提供 run(blob)：输入 (N, 3, imgsz, imgsz) 的 float32 数组，返回模型的原始输出
+    """
+
+    imgsz = 640
+    fixed_batch = None  # 导出时未开启 dynamic 则批大小固定
+
+    def predict(self, images, conf=0.25):
+        if not images:
+            return []
+        blob, metas = preprocess(images, self.imgsz)
+        if self.fixed_batch and len(images) != self.fixed_batch:
+            output = self.run_fixed(blob)
+        else:
+            output = self.run(blob)
+        return postprocess(output, metas, conf)
+
+    def run_fixed(self, blob):
+        """批大小固定的模型：按 fixed_batch 分块推理，最后一块补零后丢弃多余的输出"""
+        size = self.fixed_batch
+        outputs = []
+        for start in range(0, len(blob), size):
+            chunk = blob[start:start + size]
+            count = len(chunk)
+            if count < size:
+                chunk = np.concatenate([chunk, np.zeros((size - count,) + chunk.shape[1:], chunk.dtype)])
+            outputs.append(self.run(chunk)[:count])
+        return np.concatenate(outputs)
+
+
+class OnnxRuntimeBackend(ExportedModelBackend):
+    """ONNX Runtime CPU 推理"""
+
+    def __init__(self, path, num_threads=0):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        batch, _, height, _ = model_input.shape
+        if isinstance(height, int):
+            self.imgsz = height
+        self.fixed_batch = batch if isinstance(batch, int) else None
+
+    def run(self, blob):
+        return self.session.run(None, {self.input_name: blob})[0]
+
+
+class OpenVinoBackend(ExportedModelBackend):
+    """OpenVINO CPU 推理（可直接读取 ONNX，包括 INT8 量化后的模型）"""
+
+    def __init__(self, path, num_threads=0):
+        from openvino.runtime import Core
+        core = Core()
+        model = core.read_model(path)
+        shape = model.inputs[0].get_partial_shape()
+        if shape[2].is_static:
+            self.imgsz = shape[2].get_length()
+        self.fixed_batch = shape[0].get_length() if shape[0].is_static else None
+
+        config = {"INFERENCE_NUM_THREADS": num_threads} if num_threads else {}
+        self.compiled = core.compile_model(model, "CPU", config)
+        self.output = self.compiled.output(0)
+
+    def run(self, blob):
+        return self.compiled([blob])[self.output]
+
+
+def exported_path(weights, int8=False):
+    """best.pt → best.onnx / best_int8.onnx"""
+    stem = os.path.splitext(weights)[0]
+    return f"{stem}_int8.onnx" if int8 else f"{stem}.onnx"
+
+
+def export_onnx(weights, imgsz=640):
+    """用 ultralytics 导出 ONNX（动态批大小，便于批量推理）"""
+    from ultralytics import YOLO
+    print(f"📦 导出 ONNX: {weights}")
+    path = YOLO(weights).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+    return str(path)
+
+
+def quantize_int8(onnx_path, calibration_dir, imgsz=640, max_images=200):
+    """用校准图片对 ONNX 模型做静态 INT8 量化，只量化卷积/矩阵乘以减少精度损失"""
+    from onnxruntime.quantization import (CalibrationDataReader, QuantFormat, QuantType,
+                                          quantize_static)
+
+    files = sorted(glob.glob(os.path.join(calibration_dir, "*.jpg")) +
+                   glob.glob(os.path.join(calibration_dir, "*.png")))[:max_images]
+    if not files:
+        raise FileNotFoundError(f"校准目录中没有图片: {calibration_dir}")
+
+    class ImageCalibrationReader(CalibrationDataReader):
+        def __init__(self, input_name):
+            self.input_name = input_name
+            self.files = iter(files)
+
+        def get_next(self):
+            for path in self.files:
+                image = cv2.imread(path)
+                if image is not None:
+                    return {self.input_name: preprocess([image], imgsz)[0]}
+            return None
+
+    import onnxruntime as ort
+    input_name = ort.InferenceSession(onnx_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+
+    output_path = os.path.splitext(onnx_path)[0] + "_int8.onnx"
+    print(f"🔧 INT8 量化: {onnx_path}（{len(files)} 张校准图片）")
+    quantize_static(
+        onnx_path, output_path, ImageCalibrationReader(input_name),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+        op_types_to_quantize=["Conv", "MatMul"],
+    )
+    return output_path
+
+
+def prepare_model(weights, int8=False):
+    """确保导出的模型存在，返回其路径"""
+    cfg = INFERENCE_CONFIG
+    onnx_path = exported_path(weights)
+    if not os.path.exists(onnx_path):
+        onnx_path = export_onnx(weights, cfg['imgsz'])
+    if not int8:
+        return onnx_path
+    int8_path = exported_path(weights, int8=True)
+    if not os.path.exists(int8_path):
+        int8_path = quantize_int8(onnx_path, cfg['calibration_dir'], cfg['imgsz'])
+    return int8_path
+
+
+def load_backend(weights, backend=None, workers=None):
+    """
+    按 INFERENCE_CONFIG 创建推理后端，必要时自动导出/量化。
+    workers > 0 时返回 ProcessPoolBackend，模型在各工作进程中加载
+    """
+    cfg = INFERENCE_CONFIG
+    backend = backend or cfg['backend']
+    workers = cfg['workers'] if workers is None else workers
+    # 在导出模型和启动工作进程之前检查配置
+    if backend not in BACKENDS:
+        raise ValueError(f"未知的推理后端: {backend}（可选: {' / '.join(BACKENDS)}）")
+    path = weights
+    if backend != "ultralytics" and not weights.endswith(".onnx"):
+        path = prepare_model(weights, cfg['int8'])  # 在父进程中导出一次，工作进程直接加载
+
+    if workers > 0:
+        from process_inference import ProcessPoolBackend
+        print(f"⚙️ 推理后端: {backend} × {workers} 进程 ({path})")
+        return ProcessPoolBackend(path, backend, workers)
+    if backend == "ultralytics":
+        return UltralyticsBackend(path)
+
+    print(f"⚙️ 推理后端: {backend} ({path})")
+    if backend == "onnxruntime":
+        return OnnxRuntimeBackend(path, cfg['num_threads'])
+    return OpenVinoBackend(path, cfg['num_threads'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导出眼睛/打哈欠模型为 ONNX，可选 INT8 量化")
+    parser.add_argument("--int8", action="store_true", help="用校准集做静态 INT8 量化")
+    parser.add_argument("--calibration-dir", default=INFERENCE_CONFIG['calibration_dir'])
+    args = parser.parse_args()
+
+    INFERENCE_CONFIG['calibration_dir'] = args.calibration_dir
+    keys = ['unified_model'] if MODEL_CONFIG.get('unified_model') else ['eye_model', 'yawn_model']
+    for key in keys:
+        path = prepare_model(MODEL_CONFIG[key], int8=args.int8)
+        print(f"✅ {key}: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+推理调度器
+
+眨眼只持续约150ms，而打哈欠要持续数秒，没必要每帧都跑两个模型。
+每个检测器按自己的间隔运行（例如眼睛每帧、打哈欠每4帧），
+未运行的帧沿用上一次的状态；当某个检测器的状态发生变化时，
+在接下来的一段帧内临时提高它的运行频率，避免漏掉状态转换。
+"""
+from config import SCHEDULER_CONFIG
+
+
+class DetectorSchedule:
+    """单个检测器的调度状态"""
+
+    def __init__(self, interval, boost_interval=1, boost_frames=15):
+        self.interval = max(1, int(interval))
+        self.boost_interval = max(1, int(boost_interval))
+        self.boost_frames = boost_frames
+        self.reset()
+
+    def reset(self):
+        self.last_run = None
+        self.last_state = None
+        self.boost_until = -1
+
+    def current_interval(self, frame_index):
+        return self.boost_interval if frame_index < self.boost_until else self.interval
+
+    def is_due(self, frame_index):
+        # 帧号小于上次运行帧号说明流水线已重置（帧号从0重新开始），立即运行
+        return (self.last_run is None or frame_index < self.last_run or
+                frame_index - self.last_run >= self.current_interval(frame_index))
+
+    def mark(self, frame_index):
+        """记录本帧已安排运行（在推理之前调用，结果稍后由 record 反馈）"""
+        self.last_run = frame_index
+
+    def record(self, frame_index, state):
+        """记录一次运行结果，状态变化时进入加速窗口"""
+        if self.last_state is not None and state != self.last_state:
+            self.boost_until = frame_index + self.boost_frames
+        self.last_state = state
+
+
+class InferenceScheduler:
+    """按检测器名称（"eye"/"yawn"）管理各自的运行节奏"""
+
+    def __init__(self, config=None):
+        config = config or SCHEDULER_CONFIG
+        self.enabled = config['enabled']
+        self.schedules = {
+            name: DetectorSchedule(config[f'{name}_interval'],
+                                   config['boost_interval'],
+                                   config['boost_frames'])
+            for name in ('eye', 'yawn')
+        }
+
+    def reset(self):
+        for schedule in self.schedules.values():
+            schedule.reset()
+
+    def is_due(self, name, frame_index):
+        """本帧是否需要运行该检测器"""
+        if not self.enabled:
+            return True
+        return self.schedules[name].is_due(frame_index)
+
+    def mark(self, name, frame_index):
+        self.schedules[name].mark(frame_index)
+
+    def record(self, name, frame_index, state):
+        self.schedules[name].record(frame_index, state)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+关键点几何判定
+
+ROI 模式已经用 FaceMesh 算出了整张脸的关键点，原先只取其中7个裁剪眼睛/嘴部再交给 YOLO。
+这里直接用关键点计算：
+
+- EAR（眼睛纵横比）= (|p2-p6| + |p3-p5|) / (2|p1-p4|)，睁眼约0.3，闭眼接近0
+- MAR（嘴部纵横比）= 内唇三组上下距离的均值 / 嘴角距离，打哈欠时明显增大
+
+数值明显落在一侧时直接给出状态；处于两个阈值之间的模糊区间才对该区域运行 YOLO。
+每帧只是二十个点上的几十次向量运算。
+"""
+import numpy as np
+
+from config import GEOMETRY_CONFIG
+from frame_state import State
+
+# FaceMesh 关键点编号。两只眼睛各6个点，顺序为 p1(外眼角) p2 p3(上眼睑) p4(内眼角) p5 p6(下眼睑)；
+# 画面左侧的是人的右眼，与 crop_rois 的 right_eye 一致
+RIGHT_EYE_IDS = (33, 160, 158, 133, 153, 144)
+LEFT_EYE_IDS = (362, 385, 387, 263, 373, 380)
+# 嘴部：两个内嘴角，然后三组内唇上下点
+MOUTH_IDS = (78, 308, 81, 178, 13, 14, 311, 402)
+LANDMARK_IDS = RIGHT_EYE_IDS + LEFT_EYE_IDS + MOUTH_IDS
+
+
+def aspect_ratios(points):
+    """
+    points 为按 LANDMARK_IDS 顺序排列的 (20, 2) 像素坐标，
+    返回 (右眼EAR, 左眼EAR, MAR)
+    """
+    eyes = points[:12].reshape(2, 6, 2)
+    vertical = np.linalg.norm(eyes[:, (1, 2)] - eyes[:, (5, 4)], axis=2).sum(axis=1)
+    horizontal = np.linalg.norm(eyes[:, 0] - eyes[:, 3], axis=1)
+    ear = vertical / (2 * np.maximum(horizontal, 1e-6))
+
+    mouth = points[12:]
+    width = max(float(np.linalg.norm(mouth[0] - mouth[1])), 1e-6)
+    opening = float(np.linalg.norm(mouth[2::2] - mouth[3::2], axis=1).mean())
+    return float(ear[0]), float(ear[1]), opening / width
+
+
+class LandmarkGeometry:
+    def __init__(self, config=None):
+        cfg = config or GEOMETRY_CONFIG
+        self.ear_closed = cfg['ear_closed']
+        self.ear_open = cfg['ear_open']
+        self.mar_yawn = cfg['mar_yawn']
+        self.mar_normal = cfg['mar_normal']
+
+    @staticmethod
+    def points(face_landmarks, width, height):
+        """从 FaceMesh 结果中取出 LANDMARK_IDS 的像素坐标（按画面宽高缩放，纵横比才正确）"""
+        landmark = face_landmarks.landmark
+        points = np.array([(landmark[i].x, landmark[i].y) for i in LANDMARK_IDS])
+        points *= (width, height)
+        return points
+
+    def eye_state(self, ear):
+        if ear < self.ear_closed:
+            return State.CLOSED
+        if ear > self.ear_open:
+            return State.OPEN
+        return None
+
+    def mouth_state(self, mar):
+        if mar > self.mar_yawn:
+            return State.YAWN
+        if mar < self.mar_normal:
+            return State.NO_YAWN
+        return None
+
+    def classify(self, points):
+        """返回 {ROI key: 状态}，只包含能直接判定的区域，其余需要 YOLO"""
+        right_ear, left_ear, mar = aspect_ratios(points)
+        states = {
+            'right_eye': self.eye_state(right_ear),
+            'left_eye': self.eye_state(left_ear),
+            'mouth': self.mouth_state(mar),
+        }
+        return {key: state for key, state in states.items() if state is not None}
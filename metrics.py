@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+低开销指标与日志
+
+推理线程每秒要处理30帧，同步的 print 会明显拉低帧率（Windows 控制台尤其慢）。
+这里提供：
+- Counter / Gauge / Histogram：记录一次只是一次加法或一次二分查找
+- MetricsProfiler：把流水线各阶段耗时记入直方图
+- AsyncLogger：按 key 限频、后台线程输出的日志，格式化也在后台完成
+
+    from metrics import REGISTRY, log
+    REGISTRY.counter("frames").inc()
+    log.info("detection", "眼睛={} 打哈欠={}", eye_state, yawn_state)
+"""
+import bisect
+import queue
+import threading
+import time
+
+from config import METRICS_CONFIG
+
+
+class Counter:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class Gauge:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+
+def log_buckets(start=1e-4, end=10.0, factor=1.5):
+    """从0.1ms到10s按比例递增的桶上界（秒）"""
+    bounds = []
+    value = start
+    while value < end:
+        bounds.append(value)
+        value *= factor
+    bounds.append(end)
+    return bounds
+
+
+DEFAULT_BUCKETS = log_buckets()
+
+
+class Histogram:
+    """固定桶直方图，记录耗时分布，百分位由桶上界估计"""
+
+    __slots__ = ('bounds', 'counts', 'count', 'sum')
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, q):
+        if not self.count:
+            return 0.0
+        target = q / 100.0 * self.count
+        running = 0
+        for i, n in enumerate(self.counts):
+            running += n
+            if running >= target:
+                return self.bounds[i] if i < len(self.bounds) else self.bounds[-1]
+        return self.bounds[-1]
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'mean_ms': round(self.sum / self.count * 1000, 3) if self.count else 0.0,
+            'p50_ms': round(self.percentile(50) * 1000, 3),
+            'p95_ms': round(self.percentile(95) * 1000, 3),
+            'p99_ms': round(self.percentile(99) * 1000, 3),
+        }
+
+
+class MetricsRegistry:
+    """按名称管理指标，同名多次获取得到同一个对象"""
+
+    def __init__(self):
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+
+    def counter(self, name):
+        metric = self.counters.get(name)
+        if metric is None:
+            metric = self.counters[name] = Counter()
+        return metric
+
+    def gauge(self, name):
+        metric = self.gauges.get(name)
+        if metric is None:
+            metric = self.gauges[name] = Gauge()
+        return metric
+
+    def histogram(self, name):
+        metric = self.histograms.get(name)
+        if metric is None:
+            metric = self.histograms[name] = Histogram()
+        return metric
+
+    def snapshot(self):
+        return {
+            'counters': {name: m.value for name, m in self.counters.items()},
+            'gauges': {name: m.value for name, m in self.gauges.items()},
+            'histograms': {name: m.snapshot() for name, m in self.histograms.items()},
+        }
+
+
+class _StageTimer:
+    """单次计时，每个 with 块一个实例：嵌套或多线程同时计时同一阶段互不覆盖"""
+
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class MetricsProfiler:
+    """流水线的默认计时器：各阶段耗时记入 <prefix>.<name> 直方图"""
+
+    def __init__(self, registry, prefix="stage"):
+        self.registry = registry
+        self.prefix = prefix
+        self.histograms = {}
+
+    def stage(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = self.registry.histogram(f"{self.prefix}.{name}")
+        return _StageTimer(histogram)
+
+
+class AsyncLogger:
+    """
+    限频的异步日志：同一个 key 在 min_interval 秒内只输出一条，
+    被省略的条数附在下一条后面；队列满时直接丢弃并计数，从不阻塞调用方。
+    """
+
+    def __init__(self, min_interval=1.0, max_queue=1000):
+        self.min_interval = min_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.last_emit = {}
+        self.suppressed = {}
+        self.dropped = 0
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def info(self, key, fmt, *args):
+        now = time.monotonic()
+        last = self.last_emit.get(key)
+        if last is not None and now - last < self.min_interval:
+            self.suppressed[key] = self.suppressed.get(key, 0) + 1
+            return
+        self.last_emit[key] = now
+        suppressed = self.suppressed.pop(key, 0)
+        self.ensure_started()
+        try:
+            self.queue.put_nowait((fmt, args, suppressed))
+        except queue.Full:
+            self.dropped += 1
+
+    def ensure_started(self):
+        if self.thread is None:
+            with self.lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self.writer_loop, daemon=True)
+                    self.thread.start()
+
+    def writer_loop(self):
+        while True:
+            fmt, args, suppressed = self.queue.get()
+            try:
+                message = fmt.format(*args) if args else fmt
+            except Exception as e:
+                message = f"{fmt} (格式化失败: {e})"
+            if suppressed:
+                message += f"（已省略 {suppressed} 条）"
+            print(message)
+
+
+REGISTRY = MetricsRegistry()
+log = AsyncLogger(METRICS_CONFIG['log_interval'], METRICS_CONFIG['log_queue_size'])
@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+离线视频处理
+
+对录制好的视频文件运行完整的眼睛/打哈欠/统计流水线，不限速、无界面，
+按视频时间戳（而非墙钟）累积统计，输出每帧状态和警告事件：
+
+    python offline_runner.py trip1.mp4 trip2.mp4 -o results.jsonl
+    python offline_runner.py trip.mp4 -o results.csv --format csv --events-only
+    python offline_runner.py trip.mp4 -o results.npy   # 结构化数组，np.load(mmap_mode='r') 回放
+                                                       # 视频文件名另存为 results.videos.txt
+"""
+import argparse
+import csv
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+from detection_pipeline import FRAME_DTYPE, DetectionPipeline, FrameResult
+
+
+def video_timestamp(cap, frame_index, fps):
+    """优先使用解码器给出的时间戳，缺失时按帧号和帧率推算（秒）"""
+    msec = cap.get(cv2.CAP_PROP_POS_MSEC)
+    if msec > 0 or frame_index == 0:
+        return msec / 1000.0
+    return frame_index / fps if fps > 0 else 0.0
+
+
+class JsonlWriter:
+    def __init__(self, path):
+        self.file = open(path, 'w', encoding='utf-8')
+
+    def write(self, video, result):
+        record = {'video': video}
+        record.update(result.as_dict())
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def close(self):
+        self.file.close()
+
+
+class CsvWriter:
+    def __init__(self, path):
+        self.file = open(path, 'w', encoding='utf-8', newline='')
+        self.writer = csv.DictWriter(self.file, fieldnames=('video',) + FrameResult.FIELDS)
+        self.writer.writeheader()
+
+    def write(self, video, result):
+        record = {'video': video}
+        record.update(result.as_dict())
+        self.writer.writerow(record)
+
+    def close(self):
+        self.file.close()
+
+
+class NpyWriter:
+    """
+    保存为 FRAME_DTYPE 结构化数组（状态为 frame_state.State 编号），每行多一个视频编号，
+    编号对应 <输出文件名>.videos.txt 的行号（从0开始）。
+    数据每 CHUNK 行追加写入文件，关闭时只回填文件头中的行数，内存占用与视频长度无关。
+    """
+
+    CHUNK = 4096
+    COUNT_WIDTH = 20  # 文件头中为行数预留的宽度，回填时文件头长度不变
+
+    def __init__(self, path):
+        self.path = path
+        self.names_path = os.path.splitext(path)[0] + ".videos.txt"
+        self.dtype = np.dtype([('video', '<u2')] + FRAME_DTYPE.descr)
+        self.videos = {}
+        self.rows = []
+        self.count = 0
+        self.file = open(path, 'wb')
+        self.file.write(self.header(0))
+
+    def header(self, count):
+        """npy 1.0 格式文件头，总长度按64字节对齐且与 count 无关"""
+        shape = f"({count},)".ljust(self.COUNT_WIDTH + 3)
+        text = "{'descr': %r, 'fortran_order': False, 'shape': %s}" % (
+            np.lib.format.dtype_to_descr(self.dtype), shape)
+        length = len(np.lib.format.MAGIC_PREFIX) + 4 + len(text) + 1
+        text = text.ljust(len(text) + (-length) % 64) + "\n"
+        return np.lib.format.magic(1, 0) + len(text).to_bytes(2, 'little') + text.encode('latin1')
+
+    def video_index(self, video):
+        index = self.videos.get(video)
+        if index is None:
+            if len(self.videos) > np.iinfo(np.uint16).max:
+                raise ValueError(f"视频文件过多，超出编号范围: {video}")
+            index = self.videos[video] = len(self.videos)
+        return index
+
+    def write(self, video, result):
+        self.rows.append((self.video_index(video),) + result.as_tuple())
+        if len(self.rows) >= self.CHUNK:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            self.file.write(np.array(self.rows, dtype=self.dtype).tobytes())
+            self.count += len(self.rows)
+            self.rows = []
+
+    def close(self):
+        self.flush()
+        self.file.seek(0)
+        self.file.write(self.header(self.count))
+        self.file.close()
+        with open(self.names_path, 'w', encoding='utf-8') as names:
+            names.writelines(f"{video}\n" for video in self.videos)
+
+
+def process_video(pipeline, path, writer, events_only=False):
+    """处理单个视频文件，返回 (帧数, 警告次数, 视频时长秒)"""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        print(f"❌ 无法打开视频: {path}")
+        return 0, 0, 0.0
+
+    pipeline.reset()
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    video = os.path.basename(path)
+    frames = alerts = 0
+    timestamp = 0.0
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            timestamp = video_timestamp(cap, frames, fps)
+            result = pipeline.process_frame(frame, timestamp)
+            frames += 1
+            if result.alert_triggered:
+                alerts += 1
+            if result.alert_triggered or not events_only:
+                writer.write(video, result)
+    finally:
+        cap.release()
+    return frames, alerts, timestamp
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线处理录制的视频，输出每帧状态和警告事件")
+    parser.add_argument("videos", nargs="+", help="视频文件")
+    parser.add_argument("-o", "--output", default="results.jsonl", help="输出文件")
+    parser.add_argument("--format", choices=("jsonl", "csv", "npy"), default=None,
+                        help="输出格式，默认按输出文件扩展名判断")
+    parser.add_argument("--mode", choices=("full", "roi"), default="full", help="检测模式")
+    parser.add_argument("--events-only", action="store_true", help="只输出警告事件")
+    args = parser.parse_args()
+
+    extension = os.path.splitext(args.output)[1].lower()
+    output_format = args.format or {".csv": "csv", ".npy": "npy"}.get(extension, "jsonl")
+    pipeline = DetectionPipeline(mode=args.mode)
+    writer = None
+    total_frames = total_video_time = 0
+    start = time.time()
+    try:
+        pipeline.load_models()
+        writer = {"csv": CsvWriter, "npy": NpyWriter, "jsonl": JsonlWriter}[output_format](args.output)
+        for path in args.videos:
+            video_start = time.time()
+            frames, alerts, duration = process_video(pipeline, path, writer, args.events_only)
+            elapsed = time.time() - video_start
+            total_frames += frames
+            total_video_time += duration
+            if elapsed > 0:
+                print(f"✅ {path}: {frames} 帧, {alerts} 次警告, "
+                      f"{frames / elapsed:.1f} fps, {duration / elapsed:.1f}x 实时")
+    finally:
+        if writer is not None:
+            writer.close()
+        pipeline.close()
+
+    elapsed = time.time() - start
+    if elapsed > 0:
+        print(f"📊 共 {total_frames} 帧, 用时 {elapsed:.1f} 秒, "
+              f"{total_frames / elapsed:.1f} fps, {total_video_time / elapsed:.1f}x 实时 → {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+多进程推理
+
+采集、定位、推理和界面线程共用一个解释器，ultralytics 的 Results 构造、
+.cpu().numpy() 转换等 Python 代码会在 GIL 上排队。INFERENCE_CONFIG['workers'] > 0 时，
+load_backend 返回 ProcessPoolBackend：每个工作进程各自加载一份模型，
+
+- 图片写入与该进程共享的 SharedMemory，只通过管道发送偏移和形状，不序列化像素
+- submit() 立即返回 Future，多个请求可以同时在不同进程中推理，按提交顺序取结果
+- predict() 的一批图片较多时拆分到多个进程并行，结果按原顺序拼接
+"""
+import multiprocessing as mp
+import queue
+import threading
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+def worker_main(weights, backend, conn):
+    """工作进程：加载模型后循环处理父进程发来的推理请求"""
+    from inference_backend import load_backend
+
+    try:
+        model = load_backend(weights, backend, workers=0)
+    except Exception as e:
+        conn.send(("error", f"模型加载失败: {e}"))
+        return
+    conn.send(("ready", None))
+
+    shm = None
+    while True:
+        message = conn.recv()
+        if message[0] == "stop":
+            break
+        _, shm_name, layout, conf = message
+        try:
+            if shm is None or shm.name != shm_name:
+                if shm is not None:
+                    shm.close()
+                # spawn 的子进程与父进程共用资源跟踪器，共享内存由父进程 unlink
+                shm = shared_memory.SharedMemory(name=shm_name)
+            images = [np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=offset)
+                      for offset, shape in layout]
+            results = model.predict(images, conf=conf)
+            del images  # 释放对共享内存的引用
+            conn.send(("ok", results))
+        except Exception as e:
+            conn.send(("error", str(e)))
+    if shm is not None:
+        shm.close()
+
+
+class InferenceWorker:
+    """一个工作进程及其共享内存，由父进程中的一个派发线程使用"""
+
+    def __init__(self, context, weights, backend):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=worker_main, args=(weights, backend, child_conn), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.shm = None
+
+    def wait_ready(self):
+        status, error = self.conn.recv()
+        if status != "ready":
+            raise RuntimeError(error)
+
+    def ensure_capacity(self, nbytes):
+        if self.shm is not None and self.shm.size >= nbytes:
+            return
+        size = max(nbytes, 2 * self.shm.size if self.shm is not None else 0)
+        old = self.shm
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        if old is not None:
+            # 工作进程下次收到新名字时会关闭旧映射，这里可以先删除名字
+            old.close()
+            old.unlink()
+
+    def predict(self, images, conf):
+        images = [np.ascontiguousarray(image, dtype=np.uint8) for image in images]
+        layout, offset = [], 0
+        for image in images:
+            layout.append((offset, image.shape))
+            offset += image.nbytes
+        self.ensure_capacity(max(offset, 1))
+        for image, (start, shape) in zip(images, layout):
+            np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf, offset=start)[...] = image
+        self.conn.send(("predict", self.shm.name, layout, conf))
+        status, payload = self.conn.recv()
+        if status != "ok":
+            raise RuntimeError(f"推理进程错误: {payload}")
+        return payload
+
+    def close(self):
+        try:
+            self.conn.send(("stop",))
+        except (OSError, EOFError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+
+class ProcessPoolBackend:
+    """与其他推理后端接口相同，推理在 workers 个子进程中完成"""
+
+    def __init__(self, weights, backend, workers):
+        context = mp.get_context("spawn")  # PyTorch 等库在 fork 后不安全
+        self.workers = []
+        self.threads = []
+        try:
+            for _ in range(workers):
+                self.workers.append(InferenceWorker(context, weights, backend))
+            for worker in self.workers:
+                worker.wait_ready()
+        except Exception:
+            self.close()  # 已启动的进程不能留下
+            raise
+        self.tasks = queue.Queue()
+        self.threads = [threading.Thread(target=self.dispatch_loop, args=(worker,), daemon=True)
+                        for worker in self.workers]
+        for thread in self.threads:
+            thread.start()
+
+    def dispatch_loop(self, worker):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                break
+            images, conf, future = task
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(worker.predict(images, conf))
+            except Exception as e:
+                future.set_exception(e)
+
+    def submit(self, images, conf=0.25):
+        """异步推理，返回 Future，结果与 predict 相同"""
+        future = Future()
+        if not images:
+            future.set_result([])
+        else:
+            self.tasks.put((list(images), conf, future))
+        return future
+
+    def predict(self, images, conf=0.25):
+        images = list(images)
+        if len(images) <= 1 or len(self.workers) == 1:
+            return self.submit(images, conf).result()
+        # 拆成与进程数相同的几份并行推理，按原顺序拼接
+        chunk = -(-len(images) // len(self.workers))
+        futures = [self.submit(images[i:i + chunk], conf) for i in range(0, len(images), chunk)]
+        return [detection for future in futures for detection in future.result()]
+
+    def close(self):
+        """停止派发线程和工作进程并删除共享内存，可重复调用"""
+        for _ in self.threads:
+            self.tasks.put(None)
+        for thread in self.threads:
+            thread.join(timeout=5)
+        for worker in self.workers:
+            worker.close()
+        self.threads = []
+        self.workers = []
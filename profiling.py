@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+分阶段计时
+
+流水线在各阶段外包一层 profiler.stage(name)，默认使用 metrics.MetricsProfiler
+（记入固定桶直方图），基准测试时换成 StageProfiler 记录每次耗时并计算精确的 p50/p95/p99；
+不需要任何计时时可用 NullProfiler。
+"""
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+
+class NullProfiler:
+    """不记录任何数据"""
+
+    _context = nullcontext()
+
+    def stage(self, name):
+        return self._context
+
+
+class StageProfiler:
+    """记录每个阶段每次执行的耗时（秒）"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def reset(self):
+        self.samples.clear()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples[name].append(time.perf_counter() - start)
+
+    def summary(self):
+        """{阶段: {count, mean_ms, p50_ms, p95_ms, p99_ms}}"""
+        report = {}
+        for name, values in self.samples.items():
+            ms = np.asarray(values) * 1000.0
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+            report[name] = {
+                'count': len(ms),
+                'mean_ms': round(float(ms.mean()), 3),
+                'p50_ms': round(float(p50), 3),
+                'p95_ms': round(float(p95), 3),
+                'p99_ms': round(float(p99), 3),
+            }
+        return report
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+人脸关键点跟踪
+
+FaceMesh 每帧都要算 468 个点，但裁剪眼睛/嘴部只用其中 7 个，
+而且驾驶员头部在相邻帧之间几乎不动。这里每隔 N 帧（或跟踪丢失时）
+才运行一次 FaceMesh，中间帧用金字塔 LK 光流跟踪这 7 个点。
+
+- 前后向光流误差过大的点视为跟踪失败，用其余点的中位位移补齐
+- 可靠的点少于 min_points 时判定丢失，当帧立即重新运行 FaceMesh
+- 整体位移超过 max_motion 像素（头部快速移动）时，下一帧强制重新定位
+"""
+import cv2
+import numpy as np
+
+from config import TRACKER_CONFIG
+
+
+class RoiTracker:
+    def __init__(self, config=None):
+        config = config or TRACKER_CONFIG
+        self.enabled = config['enabled']
+        self.landmark_interval = config['landmark_interval']
+        self.max_motion = config['max_motion']
+        self.fb_error = config['fb_error']
+        self.min_points = config['min_points']
+        self.lk_params = dict(
+            winSize=(21, 21),
+            maxLevel=2,
+            criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03),
+        )
+        self.reset()
+
+    def reset(self):
+        self.prev_gray = None
+        self.points = None
+        self.frames_since_landmarks = 0
+        self.force_refresh = False
+
+    def needs_landmarks(self):
+        """本帧是否需要运行完整的 FaceMesh"""
+        return (not self.enabled or self.points is None or self.force_refresh or
+                self.frames_since_landmarks >= self.landmark_interval)
+
+    def update_landmarks(self, gray, points):
+        """FaceMesh 定位后重新设置跟踪点"""
+        self.prev_gray = gray
+        self.points = np.float32(points).reshape(-1, 1, 2)
+        self.frames_since_landmarks = 0
+        self.force_refresh = False
+
+    def track(self, gray):
+        """用光流把上一帧的关键点传播到本帧，跟踪丢失返回 None"""
+        p0 = self.points
+        p1, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, p0, None, **self.lk_params)
+        p0r, status_back, _ = cv2.calcOpticalFlowPyrLK(gray, self.prev_gray, p1, None, **self.lk_params)
+
+        fb_error = np.linalg.norm((p0 - p0r).reshape(-1, 2), axis=1)
+        good = (status.ravel() == 1) & (status_back.ravel() == 1) & (fb_error < self.fb_error)
+        if good.sum() < self.min_points:
+            self.reset()
+            return None
+
+        old = p0.reshape(-1, 2)
+        new = p1.reshape(-1, 2)
+        shift = np.median(new[good] - old[good], axis=0)
+        tracked = old + shift
+        tracked[good] = new[good]
+
+        if np.linalg.norm(shift) > self.max_motion:
+            self.force_refresh = True
+
+        self.prev_gray = gray
+        self.points = tracked.reshape(-1, 1, 2).astype(np.float32)
+        self.frames_since_landmarks += 1
+        return [(int(round(x)), int(round(y))) for x, y in tracked]
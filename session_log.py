@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+会话日志
+
+只记录状态变化和警告，不逐帧记录：眼睛/嘴部状态切换、人脸丢失/恢复、
+每次眨眼和打哈欠、进入/离开疲劳状态、发出警告。每条记录附带当时的统计值，
+事后可以还原整个行程的疲劳变化，用于审计。
+
+文件为追加写的定长二进制记录（numpy 结构化类型），16字节文件头之后逐条排列，
+读取时直接 np.memmap，不需要解析：
+
+    recorder = SessionRecorder.open("stream0")
+    pipeline.subscribe(recorder.on_result)
+    ...
+    recorder.close()
+
+    records = load_session("sessions/stream0_20240101_080000.dlog")
+    alerts = records[records['event'] == EVENT_ALERT]
+
+    python session_log.py sessions/stream0_20240101_080000.dlog --events
+"""
+import argparse
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from config import SESSION_LOG_CONFIG
+from frame_state import STATE_NAMES, State
+
+MAGIC = b"DDSLOG01"
+HEADER_DTYPE = np.dtype([('magic', 'S8'), ('start_time', '<f8')])
+RECORD_DTYPE = np.dtype([
+    ('timestamp', '<f8'),  # 帧的采集时间（秒）
+    ('frame_index', '<u4'),
+    ('event', 'u1'),
+    ('state', 'u1'),  # 事件对应的新状态编号（frame_state.State）
+    ('blinks', '<u2'),
+    ('yawns', '<u2'),
+    ('microsleeps', '<f4'),
+    ('yawn_duration', '<f4'),
+])
+
+# 事件类型
+EVENT_SESSION_START = 0
+EVENT_LEFT_EYE = 1
+EVENT_RIGHT_EYE = 2
+EVENT_MOUTH = 3
+EVENT_FACE = 4  # state: 1 检测到人脸，0 人脸丢失
+EVENT_BLINK = 5
+EVENT_YAWN = 6
+EVENT_DROWSY = 7  # state: 1 进入疲劳状态，0 恢复
+EVENT_ALERT = 8
+EVENT_SESSION_END = 9
+EVENT_NAMES = ("会话开始", "左眼", "右眼", "嘴部", "人脸", "眨眼", "打哈欠", "疲劳", "警告", "会话结束")
+
+
+def state_name(event, state):
+    """把记录中的状态编号还原为文字"""
+    if event == EVENT_FACE:
+        return "检测到" if state else "丢失"
+    if event == EVENT_DROWSY:
+        return "是" if state else "否"
+    if event in (EVENT_LEFT_EYE, EVENT_RIGHT_EYE, EVENT_MOUTH) and state < len(STATE_NAMES):
+        return STATE_NAMES[state]
+    return ""
+
+
+def session_path(name, directory=None, start_time=None):
+    directory = directory or SESSION_LOG_CONFIG['directory']
+    stamp = datetime.fromtimestamp(start_time or time.time()).strftime("%Y%m%d_%H%M%S")
+    return os.path.join(directory, f"{name}_{stamp}.dlog")
+
+
+class SessionLog:
+    """
+    追加写的二进制日志。记录先写入预分配的缓冲区，缓冲区写满时一次写入文件；
+    后台线程每隔 flush_interval 秒把缓冲的记录写盘，没有新事件时也不会一直留在内存里，
+    程序未调用 close() 就退出时最多丢失最后 flush_interval 秒的记录。
+    """
+
+    def __init__(self, path, buffer_size=None, flush_interval=None):
+        cfg = SESSION_LOG_CONFIG
+        self.path = path
+        self.flush_interval = cfg['flush_interval'] if flush_interval is None else flush_interval
+        self.buffer = np.zeros(buffer_size or cfg['buffer_size'], dtype=RECORD_DTYPE)
+        self.count = 0
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, 'ab')
+        if is_new:
+            header = np.zeros(1, dtype=HEADER_DTYPE)
+            header['magic'] = MAGIC
+            header['start_time'] = time.time()
+            self.file.write(header.tobytes())
+            self.file.flush()
+
+        self.thread = None
+        if self.flush_interval > 0:
+            self.thread = threading.Thread(target=self.flush_loop, daemon=True)
+            self.thread.start()
+
+    def flush_loop(self):
+        while not self.stop_event.wait(self.flush_interval):
+            self.flush()
+
+    def append(self, timestamp, frame_index, event, state, result):
+        """追加一条记录，统计值取自 result（FrameResult）"""
+        with self.lock:
+            record = self.buffer[self.count]
+            record['timestamp'] = timestamp
+            record['frame_index'] = frame_index
+            record['event'] = event
+            record['state'] = state
+            record['blinks'] = min(result.blinks, 0xFFFF)
+            record['yawns'] = min(result.yawns, 0xFFFF)
+            record['microsleeps'] = result.microsleeps
+            record['yawn_duration'] = result.yawn_duration
+            self.count += 1
+            if self.count == len(self.buffer):
+                self.flush_locked()
+
+    def flush(self):
+        with self.lock:
+            self.flush_locked()
+
+    def flush_locked(self):
+        if self.count and not self.file.closed:
+            self.file.write(self.buffer[:self.count].tobytes())
+            self.file.flush()
+        self.count = 0
+
+    def close(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+        with self.lock:
+            self.flush_locked()
+            self.file.close()
+
+
+class SessionRecorder:
+    """流水线订阅者：与上一帧比较，只把变化写入 SessionLog"""
+
+    def __init__(self, session_log):
+        self.log = session_log
+        self.previous = None
+
+    @classmethod
+    def open(cls, name, directory=None):
+        return cls(SessionLog(session_path(name, directory)))
+
+    def on_result(self, frame, result):
+        previous = self.previous
+        self.previous = result
+        append = self.log.append
+        ts, index = result.timestamp, result.frame_index
+        if previous is None:
+            append(ts, index, EVENT_SESSION_START, 0, result)
+            previous = _INITIAL
+
+        if result.face_found != previous.face_found:
+            append(ts, index, EVENT_FACE, int(result.face_found), result)
+        if result.left_eye_state != previous.left_eye_state:
+            append(ts, index, EVENT_LEFT_EYE, result.left_eye_state, result)
+        if result.right_eye_state != previous.right_eye_state:
+            append(ts, index, EVENT_RIGHT_EYE, result.right_eye_state, result)
+        if result.yawn_state != previous.yawn_state:
+            append(ts, index, EVENT_MOUTH, result.yawn_state, result)
+        # 统计被重置时计数会变小，只有增加才算新的眨眼/哈欠
+        if result.blinks > previous.blinks:
+            append(ts, index, EVENT_BLINK, 0, result)
+        if result.yawns > previous.yawns:
+            append(ts, index, EVENT_YAWN, 0, result)
+        if result.is_drowsy != previous.is_drowsy:
+            append(ts, index, EVENT_DROWSY, int(result.is_drowsy), result)
+        if result.alert_triggered:
+            append(ts, index, EVENT_ALERT, 0, result)
+
+    def close(self):
+        if self.previous is not None:
+            # 记下最后一帧，会话时长才完整
+            result = self.previous
+            self.log.append(result.timestamp, result.frame_index, EVENT_SESSION_END, 0, result)
+        self.log.close()
+
+
+class _InitialResult:
+    """会话开始前的假想状态，首帧与它比较"""
+    face_found = False
+    left_eye_state = right_eye_state = yawn_state = State.UNKNOWN
+    blinks = yawns = 0
+    is_drowsy = False
+
+
+_INITIAL = _InitialResult()
+
+
+def load_session(path):
+    """
+    以只读 memmap 打开会话日志，返回结构化数组（RECORD_DTYPE）。
+    程序异常退出时末尾可能有不完整的记录，读取时忽略。
+    """
+    header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+    if len(header) == 0 or header['magic'][0] != MAGIC:
+        raise ValueError(f"不是会话日志文件: {path}")
+    count = (os.path.getsize(path) - HEADER_DTYPE.itemsize) // RECORD_DTYPE.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_DTYPE.itemsize, shape=(count,))
+
+
+def summarize(records):
+    """会话概要：时长、眨眼/打哈欠次数、警告次数、疲劳累计时长"""
+    if len(records) == 0:
+        return {'duration': 0.0, 'blinks': 0, 'yawns': 0, 'alerts': 0, 'drowsy_time': 0.0}
+    events = records['event']
+    timestamps = records['timestamp']
+
+    # 疲劳累计时长：每段“进入”到下一次“恢复”（或会话结束）
+    drowsy = records[events == EVENT_DROWSY]
+    drowsy_time = 0.0
+    entered = None
+    for timestamp, state in zip(drowsy['timestamp'], drowsy['state']):
+        if state and entered is None:
+            entered = timestamp
+        elif not state and entered is not None:
+            drowsy_time += timestamp - entered
+            entered = None
+    if entered is not None:
+        drowsy_time += timestamps[-1] - entered
+
+    return {
+        'duration': float(timestamps[-1] - timestamps[0]),
+        'blinks': int(np.count_nonzero(events == EVENT_BLINK)),
+        'yawns': int(np.count_nonzero(events == EVENT_YAWN)),
+        'alerts': int(np.count_nonzero(events == EVENT_ALERT)),
+        'drowsy_time': float(drowsy_time),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查看会话日志")
+    parser.add_argument("paths", nargs="+", help="会话日志文件（.dlog）")
+    parser.add_argument("--events", action="store_true", help="列出所有事件")
+    args = parser.parse_args()
+
+    for path in args.paths:
+        records = load_session(path)
+        summary = summarize(records)
+        print(f"📄 {path}: {len(records)} 条记录, 时长 {summary['duration']:.1f} 秒, "
+              f"眨眼 {summary['blinks']} 次, 打哈欠 {summary['yawns']} 次, "
+              f"警告 {summary['alerts']} 次, 疲劳 {summary['drowsy_time']:.1f} 秒")
+        if args.events:
+            for record in records:
+                event = int(record['event'])
+                name = EVENT_NAMES[event] if event < len(EVENT_NAMES) else str(event)
+                print(f"  {record['timestamp']:.3f} #{record['frame_index']} {name} "
+                      f"{state_name(event, record['state'])} | 眨眼={record['blinks']} "
+                      f"闭眼={record['microsleeps']:.2f}秒 打哈欠={record['yawns']}次")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+分阶段并行执行
+
+DetectionPipeline.run 在一个线程里依次完成 读帧 → 定位 → 推理 → 统计 → 发布（绘制），
+每帧耗时是各阶段之和。这里把各阶段放到独立线程，用有界队列连接：
+
+    FrameCapture → locate → [队列] → infer → [队列] → finish → [队列] → publish
+
+第 N 帧推理的同时，第 N+1 帧已在读取和定位，吞吐量由最慢的阶段决定。
+队列满时按配置的策略处理：block 等待下游（反压）、drop_oldest 丢弃最旧的、
+drop_newest 丢弃新来的；丢弃的帧不计入统计，其时长由下一帧的时间戳补上。
+推理队列的丢帧在 begin_frame 之前决定（定位会推进调度器和关键点跟踪）：
+drop_oldest/block 先等推理队列有空位再取帧，等待期间采集槽只保留最新一帧；
+drop_newest 在队列满时直接丢弃新取到的帧。
+调度器在 begin_frame 安排运行时就记下运行帧号，推理节奏不受定位领先推理的帧数影响；
+只有状态变化触发的加速要等 end_frame 取回结果后才生效，会晚几帧。
+调度器和跟踪器的状态由 DetectionPipeline 的锁保护。
+启用多进程推理（INFERENCE_CONFIG['workers'] > 0）时，infer 阶段只提交不等待，
+finish 阶段按顺序取回结果，最多有 workers 帧同时在不同的工作进程中推理。
+
+    runner = StagedRunner(pipeline)
+    runner.start(cap)
+    ...
+    runner.stop()
+"""
+import queue
+import threading
+import time
+
+from config import INFERENCE_CONFIG, STAGED_CONFIG
+from frame_capture import FrameCapture
+from metrics import REGISTRY, MetricsProfiler, log
+
+POLICIES = ("block", "drop_oldest", "drop_newest")
+END = object()  # 视频结束标记，沿各阶段依次传递，处理完剩余的帧后退出
+
+
+class StageQueue:
+    """有界队列，满时按策略反压或丢弃"""
+
+    def __init__(self, name, maxsize, policy, stop_event):
+        if policy not in POLICIES:
+            raise ValueError(f"未知的队列策略: {policy}")
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.policy = policy
+        self.stop_event = stop_event
+        self.space = threading.Condition()  # get 取走数据后通知 wait_space
+        self.dropped_counter = REGISTRY.counter(f"{name}.dropped")
+
+    def full(self):
+        return self.queue.full()
+
+    def wait_space(self, timeout=0.1):
+        """等待队列有空位，超时返回 False"""
+        with self.space:
+            if self.queue.full():
+                self.space.wait(timeout)
+            return not self.queue.full()
+
+    def put(self, item):
+        if self.policy == "block":
+            while not self.stop_event.is_set():
+                try:
+                    self.queue.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+            return
+        try:
+            self.queue.put_nowait(item)
+            return
+        except queue.Full:
+            pass
+        self.dropped_counter.inc()
+        if self.policy == "drop_newest":
+            return
+        try:
+            self.queue.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            pass
+
+    def close(self):
+        """放入结束标记，不受丢弃策略影响"""
+        while not self.stop_event.is_set():
+            try:
+                self.queue.put(END, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def get(self, timeout=0.1):
+        try:
+            item = self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        with self.space:
+            self.space.notify_all()
+        return item
+
+
+class StagedRunner:
+    def __init__(self, pipeline, config=None):
+        self.pipeline = pipeline
+        self.config = config or STAGED_CONFIG
+        self.profiler = MetricsProfiler(REGISTRY, prefix=f"{pipeline.name}.staged")
+        self.stop_event = threading.Event()
+        self.capture = None
+        self.to_infer = None
+        self.pace = 0.0
+        self.next_read = 0.0
+        self.threads = []
+
+    def start(self, cap, stop_on_eof=False, pace=0.0):
+        """
+        启动采集和各阶段线程；cap 可以是 cv2.VideoCapture 或 FrameCapture。
+        pace > 0 时两帧开始处理的间隔至少为 pace 秒（与 DetectionPipeline.start 的 pace 作用相同）
+        """
+        self.stop()
+        self.stop_event.clear()
+        self.pace = pace
+        self.next_read = 0.0
+        name = self.pipeline.name
+        size = self.config['queue_size']
+        self.capture = cap if isinstance(cap, FrameCapture) else \
+            FrameCapture(cap, stop_on_eof=stop_on_eof, name=f"{name}.capture")
+        self.capture.start()
+
+        to_infer = self.to_infer = StageQueue(f"{name}.staged.infer_queue", size, self.config['infer_policy'],
+                                              self.stop_event)
+        # 已提交的推理在此排队等待结果，队列至少要容纳各工作进程同时在推理的帧
+        to_finish = StageQueue(f"{name}.staged.finish_queue", max(size, INFERENCE_CONFIG['workers']),
+                               self.config['finish_policy'], self.stop_event)
+        to_publish = StageQueue(f"{name}.staged.publish_queue", size, self.config['publish_policy'],
+                                self.stop_event)
+
+        stages = (
+            ("locate", self.read_capture, self.locate, to_infer),
+            ("infer", to_infer.get, self.infer, to_finish),
+            ("finish", to_finish.get, self.finish, to_publish),
+            ("publish", to_publish.get, self.publish, None),
+        )
+        self.threads = [
+            threading.Thread(target=self.stage_loop, args=stage, daemon=True, name=f"{name}.{stage[0]}")
+            for stage in stages
+        ]
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def read_capture(self):
+        """定位阶段的输入：丢帧和限速都在取帧时完成，不会推进调度器和跟踪器"""
+        if self.to_infer.policy != "drop_newest" and not self.to_infer.wait_space():
+            return None
+        if self.pace:
+            delay = self.next_read - time.time()
+            if delay > 0 and self.stop_event.wait(delay):
+                return None
+        item = self.capture.read(timeout=0.1)
+        if item is None:
+            return END if self.capture.finished else None
+        if self.to_infer.policy == "drop_newest" and self.to_infer.full():
+            self.to_infer.dropped_counter.inc()
+            return None
+        self.next_read = time.time() + self.pace
+        return item
+
+    def stage_loop(self, name, get, work, output):
+        while not self.stop_event.is_set():
+            item = get()
+            if item is None:
+                continue
+            if item is END:
+                if output is not None:
+                    output.close()
+                return
+            try:
+                with self.profiler.stage(name):
+                    item = work(item)
+            except Exception as e:
+                log.info(f"staged_{name}_error", "❌ {} 阶段处理错误: {}", name, e)
+                continue
+            if output is not None and item is not None:
+                output.put(item)
+
+    def locate(self, captured):
+        job = self.pipeline.begin_frame(captured.frame, captured.timestamp)
+        return captured, job
+
+    def infer(self, item):
+        captured, job = item
+        self.pipeline.submit_job(job)
+        return captured, job
+
+    def finish(self, item):
+        captured, job = item
+        return captured, self.pipeline.end_frame(job, self.pipeline.collect_job(job))
+
+    def publish(self, item):
+        captured, result = item
+        self.pipeline.publish(captured.frame, result)
+        self.pipeline.capture_latency_histogram.observe(time.time() - captured.timestamp)
+
+    def is_running(self):
+        return any(thread.is_alive() for thread in self.threads)
+
+    def stop(self):
+        self.stop_event.set()
+        if self.capture is not None:
+            self.capture.stop()
+        for thread in self.threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout=2)
+        self.threads = []
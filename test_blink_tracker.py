@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试眨眼时长/间隔的流式分位数（QuantileSketch）的精度
+"""
+import numpy as np
+
+from blink_tracker import QuantileSketch
+
+RELATIVE_ACCURACY = 0.02
+
+
+def assert_close(estimate, expected):
+    error = abs(estimate / expected - 1)
+    assert error <= RELATIVE_ACCURACY, f"估计 {estimate:.4f}, 实际 {expected:.4f}"
+
+
+def test_random_durations():
+    """对数正态分布的眨眼时长：p50/p90 相对误差不超过2%"""
+    values = np.random.default_rng(0).lognormal(-1.5, 0.5, 5000)
+    sketch = QuantileSketch(RELATIVE_ACCURACY)
+    for value in values:
+        sketch.add(value)
+    assert_close(sketch.p50, np.quantile(values, 0.5))
+    assert_close(sketch.p90, np.quantile(values, 0.9))
+
+
+def test_first_sample_outlier():
+    """第一个样本远大于之后的样本时桶窗口下移，而不是把后面的样本都并进最低的桶"""
+    for first, value in ((1.8, 0.08), (30.0, 1.5)):
+        sketch = QuantileSketch(RELATIVE_ACCURACY)
+        sketch.add(first)
+        for _ in range(1000):
+            sketch.add(value)
+        assert_close(sketch.p50, value)
+
+
+def test_decayed_outlier():
+    """开启半衰期时同样适用（旧样本的权重只是变小，不会变成零）"""
+    sketch = QuantileSketch(RELATIVE_ACCURACY, half_life=900)
+    sketch.add(1.8, 0.0)
+    for i in range(1000):
+        sketch.add(0.08, 1.0 + i)
+    assert_close(sketch.p50, 0.08)
+
+
+def test_range_exceeds_buckets():
+    """取值范围超过 max_buckets 时只合并最低的桶，高端分位数不受影响"""
+    sketch = QuantileSketch(RELATIVE_ACCURACY, max_buckets=32)
+    for value in [0.02] * 10 + [5.0] * 1000:
+        sketch.add(value)
+    assert_close(sketch.p50, 5.0)
+    assert_close(sketch.p90, 5.0)
+
+
+def main():
+    for test in (test_random_durations, test_first_sample_outlier, test_decayed_outlier,
+                 test_range_exceeds_buckets):
+        try:
+            test()
+            print(f"✅ {test.__doc__}")
+        except AssertionError as e:
+            print(f"❌ {test.__doc__}: {e}")
+
+
+if __name__ == "__main__":
+    main()
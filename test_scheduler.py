@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试推理调度在分阶段执行和重置后的节奏（不需要摄像头和模型权重）
+"""
+import time
+
+import numpy as np
+
+from config import SCHEDULER_CONFIG
+from detection_pipeline import DetectionPipeline
+from frame_capture import FrameCapture
+from staged_pipeline import StagedRunner
+
+
+class SlowModel:
+    """模拟推理耗时的模型，总是返回一个“睁眼/正常”的检测框"""
+
+    def __init__(self, delay=0.01):
+        self.delay = delay
+
+    def predict(self, images, conf=0.25):
+        time.sleep(self.delay)
+        return [(np.zeros((1, 4), np.float32), np.array([0.9], np.float32), np.array([1]))
+                for _ in images]
+
+
+class FastCapture:
+    """比推理快得多的“摄像头”，读完 frames 帧后结束"""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.frame = np.zeros((64, 64, 3), np.uint8)
+
+    def read(self):
+        if self.frames <= 0:
+            return False, None
+        self.frames -= 1
+        time.sleep(0.001)
+        return True, self.frame
+
+    def get(self, prop):
+        return 0
+
+    def release(self):
+        pass
+
+
+def make_pipeline():
+    pipeline = DetectionPipeline("full", name="test_scheduler")
+    pipeline.detecteye = SlowModel()
+    pipeline.detectyawn = SlowModel()
+    pipeline.model_loaded = True
+    return pipeline
+
+
+def test_staged_yawn_cadence():
+    """定位领先推理时打哈欠模型仍按 yawn_interval 运行"""
+    pipeline = make_pipeline()
+    results = []
+    pipeline.subscribe(lambda frame, result: results.append(result))
+    runner = StagedRunner(pipeline).start(FrameCapture(FastCapture(300), stop_on_eof=True))
+    while runner.is_running():
+        time.sleep(0.05)
+    runner.stop()
+
+    interval = SCHEDULER_CONFIG['yawn_interval']
+    runs = [result.frame_index for result in results if result.yawn_inferred]
+    assert len(results) > 2 * interval
+    assert all(b - a >= interval for a, b in zip(runs, runs[1:])), runs
+    assert len(runs) <= len(results) // interval + 1, (len(runs), len(results))
+
+
+def test_reset_while_running():
+    """重置时仍在处理中的帧不会让调度器停止推理"""
+    pipeline = make_pipeline()
+    frame = np.zeros((64, 64, 3), np.uint8)
+    for i in range(100):
+        pipeline.process_frame(frame, i / 30)
+    job = pipeline.begin_frame(frame, 100 / 30)
+    pipeline.reset()
+    pipeline.end_frame(job, pipeline.infer_job(job))
+
+    results = [pipeline.process_frame(frame, i / 30) for i in range(50)]
+    assert all(result.eye_inferred for result in results)
+
+
+def main():
+    for test in (test_staged_yawn_cadence, test_reset_while_running):
+        try:
+            test()
+            print(f"✅ {test.__doc__}")
+        except AssertionError as e:
+            print(f"❌ {test.__doc__}: {e}")
+
+
+if __name__ == "__main__":
+    main()